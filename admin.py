@@ -0,0 +1,239 @@
+# ====== Блюпринт admin: создание, правка и удаление статей и товаров, /metrics ======
+#
+# Здесь же файлы картинок товаров: удаление ненужных после COMMIT и фоновая
+# очистка UPLOAD_FOLDER (см. images.py).
+
+from functools import partial
+
+from flask import Blueprint, abort, current_app, redirect, render_template, request
+from flask_login import login_required
+
+from auth import admin_required
+from blog import articles_changed
+from catalog import item_removed, items_changed, update_related
+from extensions import db, image_store, request_metrics
+from images import Reconciler
+from models import Article, Item, ItemImage, ItemListing, ItemRelated, ItemViewDaily
+from related import affected as related_affected
+
+bp = Blueprint("admin", __name__)
+
+# Поток очистки картинок; создаётся в init_app(), запускается первым запросом
+image_reconciler = None
+
+
+def init_app(app):
+    global image_reconciler
+    image_reconciler = Reconciler(partial(reconcile_images, app), interval=app.config['IMAGE_RECONCILE_INTERVAL'])
+
+
+def reconcile_images(app, dry_run=False):
+    # Удаляет из UPLOAD_FOLDER файлы хранилища без строк ItemImage и брошенные загрузки
+    with app.app_context():
+        referenced = [row.filename for row in db.session.query(ItemImage.filename)]
+    return image_store.reconcile(referenced, grace=app.config['IMAGE_RECONCILE_GRACE'], dry_run=dry_run)
+
+
+@bp.before_app_request
+def start_background_jobs():
+    image_reconciler.ensure_started()
+
+
+def remove_unused_images(filenames):
+    # Вызывается только после COMMIT. Одна и та же картинка (по хешу) может
+    # принадлежать нескольким товарам — файл удаляем, если на него больше никто не ссылается
+    for filename in set(filenames):
+        if ItemImage.query.filter_by(filename=filename).first() is None:
+            image_store.remove(filename)
+
+
+@bp.route('/metrics')
+@admin_required
+def metrics():
+    # Метрики этого процесса в формате Prometheus
+    if not current_app.config['METRICS_ENABLED']:
+        abort(404)
+    return request_metrics.render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+
+@bp.route('/posts/<int:id>/delete')
+@login_required
+@admin_required
+def post_delete(id):
+    # Удаление статьи
+    article = Article.query.get_or_404(id)  # достаем статью по ID или выдаём 404
+    try:
+
+        db.session.delete(article)  # удаляем из базы
+        db.session.commit()  # подтверждаем изменения
+        articles_changed(id)
+        return redirect("/posts")  # возвращаемся на список статей
+    except:
+        return "Произошла ошибка"
+
+
+@bp.route('/cat/<int:id>/delete')
+@login_required
+@admin_required
+def item_delete(id):
+    # Удаление товара
+    item = Item.query.get_or_404(id)  # достаем товар по ID или выдаём 404
+    try:
+        filenames = [img.filename for img in item.images]
+        related_ids = related_affected(db.session, ItemListing, ItemRelated, item.id, [item.artist]) - {item.id}
+
+        ItemViewDaily.query.filter_by(item_id=item.id).delete()  # статистика просмотров по дням
+        ItemRelated.query.filter((ItemRelated.item_id == item.id) | (ItemRelated.related_id == item.id)).delete()
+        db.session.delete(item)  # удаляем из базы
+        db.session.commit()  # подтверждаем изменения
+    except:
+        db.session.rollback()
+        return "Произошла ошибка"
+
+    # Файлы изображений удаляем с диска только после успешного COMMIT
+    remove_unused_images(filenames)
+    item_removed(id)
+    update_related(related_ids)
+    return redirect("/cat")  # возвращаемся в список товаров
+
+
+@bp.route('/posts/<int:id>/update', methods=['POST','GET'])
+@login_required
+@admin_required
+def post_update(id):
+    # Редактирование статьи
+    article = Article.query.get(id)  # достаем статью по ID
+    if request.method == "POST":
+        # Если форма отправлена методом POST — обновляем данные
+        article.title = request.form["title"]
+        article.intro = request.form["intro"]
+        article.text = request.form["text"]
+
+        try:
+            db.session.commit()  # сохраняем изменения
+            articles_changed(article.id)
+            return redirect("/posts")
+        except:
+            return "Возникла ошибка"
+    else:
+        # Если метод GET — отображаем форму с текущими данными
+        return render_template("post_update.html", article=article)
+
+
+@bp.route('/cat/<int:id>/update', methods=['POST','GET'])
+@login_required
+@admin_required
+def item_update(id):
+    # Редактирование товара
+    item = Item.query.get_or_404(id)  # достаем товар по ID
+    if request.method == "POST":
+        old_artist = item.artist  # похожие товары пересчитаем и у прежнего исполнителя
+        # Если форма отправлена методом POST — обновляем данные
+        item.title = request.form["title"]
+        item.price = request.form["price"]
+        item.text = request.form["text"]
+        item.artist = request.form["artist"]
+        item.genre = request.form["genre"]
+        item.release_year = request.form["release_year"]
+
+        files = [file for file in request.files.getlist('images') if file.filename]
+        staged = []  # загруженные файлы во временной папке: (имя в хранилище, временный путь)
+        old_files = []
+
+        try:
+            for file in files:
+                staged.append(image_store.stage(file))
+
+            if staged:
+                old_files = [img.filename for img in item.images]
+                for img in item.images:
+                    db.session.delete(img)
+                for filename, _ in staged:
+                    new_img = ItemImage(item_id=item.id,filename=filename)
+                    db.session.add(new_img)
+                item.cover_image = staged[0][0]  # первая картинка — обложка
+
+            db.session.commit()  # сохраняем изменения
+        except:
+            db.session.rollback()
+            image_store.discard(staged)
+            return "Возникла ошибка"
+
+        # Только теперь новые файлы встают на место, а старые удаляются
+        image_store.publish(staged)
+        remove_unused_images(old_files)
+        items_changed(item.id)
+        update_related(related_affected(db.session, ItemListing, ItemRelated, item.id, [old_artist, item.artist]))
+        return redirect("/cat")
+    else:
+        # Если метод GET — отображаем форму с текущими данными
+        return render_template("item_update.html", item=item)
+
+
+@bp.route('/create-article', methods=['POST','GET'])
+@login_required
+@admin_required
+def create_article():
+    # Создание новой статьи
+    if request.method == "POST":
+        # Получаем данные из формы
+        title = request.form["title"]
+        intro = request.form["intro"]
+        text = request.form["text"]
+
+        article = Article(title=title,intro=intro,text=text)  # создаем объект статьи
+
+        try:
+            db.session.add(article)  # добавляем в базу
+            db.session.commit()  # сохраняем изменения
+            articles_changed()
+            return redirect("/posts")  # перенаправляем на список статей
+        except:
+            return "Возникла ошибка"
+    else:
+        # Если метод GET — отображаем форму создания
+        return render_template("create-article.html")
+
+
+@bp.route('/create-item', methods=['POST','GET'])
+@login_required
+@admin_required
+def create_item():
+    # Создание нового товара
+    if request.method == "POST":
+        # Получаем данные из формы
+        title = request.form["title"]
+        price = request.form["price"]
+        text = request.form["text"]
+        artist = request.form["artist"]
+        genre = request.form["genre"]
+        release_year = request.form["release_year"]
+
+        item = Item(title=title,price=price,text=text, artist = artist, genre=genre,release_year=release_year)  # создаём объект товара
+
+        files = [file for file in request.files.getlist('images') if file.filename]
+        staged = []  # загруженные файлы во временной папке: (имя в хранилище, временный путь)
+
+        try:
+            for file in files:
+                staged.append(image_store.stage(file))
+            for filename, _ in staged:
+                item.images.append(ItemImage(filename=filename))
+            if staged:
+                item.cover_image = staged[0][0]  # первая картинка — обложка
+
+            db.session.add(item)  # добавляем в базу вместе с картинками
+            db.session.commit()  # одна транзакция вместо двух
+        except:
+            db.session.rollback()
+            image_store.discard(staged)
+            return "Возникла ошибка"
+
+        # Файлы встают на место только после успешного COMMIT
+        image_store.publish(staged)
+        items_changed(item.id)
+        update_related(related_affected(db.session, ItemListing, ItemRelated, item.id, [item.artist]))
+        return redirect("/cat")  # перенаправляем на каталог
+    else:
+        # Если метод GET — отображаем форму создания
+        return render_template("create-item.html")
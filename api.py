@@ -0,0 +1,88 @@
+# ====== JSON API (только чтение) ======
+#
+# /api/v1/items, /api/v1/items/<id>, /api/v1/articles — те же данные, что
+# и в каталоге/статьях, но без шаблонов и фасетов. Здесь — общие части:
+#
+#   - ?fields=id,title,price — отдаются только перечисленные поля (и из
+#     базы читаются только нужные столбцы), неизвестное поле — ошибка 400;
+#   - ETag считается ДО выборки данных — из номеров версий data_version
+#     ("items", "articles", "views", см. data_version.py), пути и
+#     параметров. Номера общие для всех воркеров, поэтому повторный запрос
+#     с If-None-Match получает 304 в любом из них одним запросом по
+#     первичному ключу, пока данные не изменились;
+#   - сжатие gzip, а если установлен пакет brotli — и br.
+
+import gzip
+import hashlib
+import json
+
+try:
+    import brotli
+except ImportError:  # без brotli отвечаем gzip
+    brotli = None
+
+API_VERSION = "v1"
+# Меньше этого сжимать нет смысла: заголовки и так больше выигрыша
+COMPRESS_MIN_SIZE = 1024
+
+
+class ApiError(Exception):
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def parse_fields(raw, allowed, default):
+    # "id,title" -> ["id", "title"]; allowed — все допустимые поля по порядку
+    if not raw:
+        return list(default)
+    fields = [field.strip() for field in raw.split(",") if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise ApiError(400, "unknown fields: %s (allowed: %s)" % (", ".join(unknown), ", ".join(allowed)))
+    return [field for field in allowed if field in fields]
+
+
+def parse_limit(raw, default, maximum):
+    if raw is None or raw == "":
+        return default
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise ApiError(400, "limit must be an integer") from None
+    if limit < 1:
+        raise ApiError(400, "limit must be at least 1")
+    return min(limit, maximum)
+
+
+def pick(data, fields):
+    # Только выбранные поля; datetime -> ISO 8601
+    result = {}
+    for field in fields:
+        value = data[field] if isinstance(data, dict) else getattr(data, field)
+        result[field] = value.isoformat() if hasattr(value, "isoformat") else value
+    return result
+
+
+def make_etag(version, path, args):
+    # version — строка номеров версий (data_version.current), args — пары параметров URL
+    args = sorted((k, v) for k, v in args if v != "")
+    raw = "%s|%s|%s|%s" % (API_VERSION, version, path, args)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def encode(payload):
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def compress(body, accept_encodings):
+    # (тело, Content-Encoding или None); accept_encodings — request.accept_encodings
+    if len(body) < COMPRESS_MIN_SIZE:
+        return body, None
+    if brotli is not None and accept_encodings["br"] > 0:
+        return brotli.compress(body, quality=5), "br"
+    if accept_encodings["gzip"] > 0:
+        return gzip.compress(body, compresslevel=6), "gzip"
+    return body, None
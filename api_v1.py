@@ -0,0 +1,142 @@
+# ====== Блюпринт api: JSON API /api/v1/... (только чтение) ======
+#
+# Роуты поверх общих частей из api.py: те же фильтры, сортировки и кеш
+# страниц товаров, что у каталога (catalog.py) и статей (blog.py).
+
+from flask import Blueprint, current_app, request
+
+from api import API_VERSION, ApiError, compress, encode as encode_json, make_etag, parse_fields, parse_limit, pick
+from auth import read_replica
+from blog import ARTICLE_SORT, article_list_query
+from catalog import CATALOG_SORTS, filter_catalog, filter_facets, item_detail_data
+from data_version import current as current_versions
+from extensions import db
+from facets import YEAR_LIMIT, parse_years
+from models import Article, DataVersion, ItemListing
+from pagination import InvalidCursor, keyset_paginate
+from price_stats import price_range
+
+bp = Blueprint("api", __name__, url_prefix="/api/" + API_VERSION)
+
+# Поля товара в списке: всё, что можно выбрать в ?fields=, и что отдаётся по умолчанию
+API_ITEM_FIELDS = ["id", "title", "price", "isActive", "artist", "genre", "release_year",
+                   "views", "created_at", "cover_image"]
+API_ITEM_DEFAULT = ["id", "title", "price", "isActive", "artist", "genre", "release_year", "cover_image"]
+API_ITEM_DETAIL_FIELDS = ["id", "title", "price", "isActive", "artist", "genre", "release_year",
+                          "text", "images", "related"]
+API_ARTICLE_FIELDS = ["id", "title", "intro", "date", "text"]
+API_ARTICLE_DEFAULT = ["id", "title", "intro", "date"]
+
+
+@bp.errorhandler(ApiError)
+def api_error(error):
+    return api_response({"error": error.message}, status=error.status)
+
+
+def api_etag(*names):
+    # ETag до выборки данных: номера версий (общие для воркеров) + путь + параметры (см. api.py)
+    return make_etag(current_versions(db.session, DataVersion.__table__, *names), request.path,
+                     request.args.items(multi=True))
+
+
+def api_not_modified(etag):
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+        api_headers(response, etag)
+        return response
+    return None
+
+
+def api_headers(response, etag):
+    if etag:
+        response.set_etag(etag, weak=True)  # тело бывает сжатым и нет — ETag слабый
+        response.cache_control.public = True
+        response.cache_control.no_cache = True  # хранить можно, но сверяться по ETag
+    response.vary.add("Accept-Encoding")
+
+
+def api_response(payload, etag=None, status=200):
+    body, encoding = compress(encode_json(payload), request.accept_encodings)
+    response = current_app.response_class(body, status=status, mimetype="application/json")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    api_headers(response, etag if status == 200 else None)
+    return response
+
+
+def api_paginate(query, keys, per_page, scope):
+    # Как keyset_paginate, но негодный курсор — ошибка 400, а не молча первая страница
+    try:
+        return keyset_paginate(query, keys, cursor=request.args.get("cursor"), per_page=per_page,
+                               scope=scope, strict=True)
+    except InvalidCursor as error:
+        raise ApiError(400, "invalid cursor: %s" % error) from None
+
+
+def api_page(pagination, data):
+    return {"data": data, "next": pagination.next_cursor, "prev": pagination.prev_cursor}
+
+
+@bp.route('/items')
+@read_replica
+def api_items():
+    # Те же фильтры и сортировки, что у /cat: active, min_price, max_price,
+    # artist/genre/year (можно несколько), sort; страницы — по курсору ?cursor=
+    fields = parse_fields(request.args.get("fields"), API_ITEM_FIELDS, API_ITEM_DEFAULT)
+    sort = request.args.get("sort") or "new"
+    if sort not in CATALOG_SORTS:
+        raise ApiError(400, "unknown sort: %s (allowed: %s)" % (sort, ", ".join(CATALOG_SORTS)))
+    # Просмотры пишутся каждые несколько секунд — от них зависят только поле views и сортировка popular
+    etag = api_etag("items", *(["views"] if sort == "popular" or "views" in fields else []))
+    not_modified = api_not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+
+    config = current_app.config
+    limit = parse_limit(request.args.get("limit"), config['API_PAGE_SIZE'], config['API_MAX_PAGE_SIZE'])
+    years = request.args.getlist("year")
+    if len(parse_years(years)) != len(years):
+        raise ApiError(400, "year must be an integer from 0 to %d" % YEAR_LIMIT)
+    years = parse_years(years)
+
+    min_price, max_price = price_range(request.args.get("min_price"), request.args.get("max_price"))
+    query = filter_catalog(ItemListing.query, request.args.get("active") == "1", min_price, max_price)
+    query = filter_facets(query, request.args.getlist("artist"), request.args.getlist("genre"), years)
+    keys = CATALOG_SORTS[sort]
+    # Читаем только выбранные поля и ключ сортировки (для курсора)
+    columns = dict.fromkeys(fields + [key.column.key for key in keys])
+    query = query.options(db.load_only(*[getattr(ItemListing, name) for name in columns]))
+
+    pagination = api_paginate(query, keys, limit, "api:" + sort)
+    return api_response(api_page(pagination, [pick(item, fields) for item in pagination.items]), etag)
+
+
+@bp.route('/items/<int:id>')
+@read_replica
+def api_item(id):
+    etag = api_etag("items")
+    not_modified = api_not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+    fields = parse_fields(request.args.get("fields"), API_ITEM_DETAIL_FIELDS, API_ITEM_DETAIL_FIELDS)
+    item = item_detail_data(id)  # тот же кеш, что у страницы товара
+    if item is None:
+        raise ApiError(404, "item not found")
+    return api_response(pick(item, fields), etag)
+
+
+@bp.route('/articles')
+@read_replica
+def api_articles():
+    etag = api_etag("articles")
+    not_modified = api_not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+    config = current_app.config
+    fields = parse_fields(request.args.get("fields"), API_ARTICLE_FIELDS, API_ARTICLE_DEFAULT)
+    limit = parse_limit(request.args.get("limit"), config['POSTS_PER_PAGE'], config['API_MAX_PAGE_SIZE'])
+    query = article_list_query()
+    if "text" in fields:
+        query = query.options(db.undefer(Article.text))
+    pagination = api_paginate(query, ARTICLE_SORT, limit, "api:articles")
+    return api_response(api_page(pagination, [pick(article, fields) for article in pagination.items]), etag)
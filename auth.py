@@ -0,0 +1,126 @@
+# ====== Блюпринт auth: регистрация, вход, выход ======
+#
+# Здесь же то, что нужно остальным блюпринтам про текущего пользователя:
+# снимок пользователя в памяти (user_cache.py) и декораторы admin_required
+# и read_replica.
+
+from functools import wraps
+
+from flask import Blueprint, abort, redirect, render_template, request, url_for
+from flask_login import current_user, login_required, login_user, logout_user
+
+from database import use_replica
+from extensions import db, login_manager, password_hasher
+from models import User
+from passwords import PasswordHasherBusy
+from rate_limit import RateLimiter
+from user_cache import UserCache, UserSnapshot
+
+bp = Blueprint("auth", __name__)
+
+
+def load_user_snapshot(user_id):
+    row = db.session.query(User.id, User.username, User.is_admin).filter(User.id == user_id).first()
+    return UserSnapshot(*row) if row else None
+
+user_cache = UserCache(load_user_snapshot)
+# Попыток входа с одного IP и неудачных — на одно имя; лимиты — в init_app()
+login_ip_limiter = RateLimiter(20, 60)
+login_user_limiter = RateLimiter(5, 300)
+
+
+def init_app(app):
+    user_cache.ttl = app.config['USER_CACHE_TTL']
+    login_ip_limiter.limit, login_ip_limiter.window = app.config['LOGIN_RATE_LIMIT_IP']
+    login_user_limiter.limit, login_user_limiter.window = app.config['LOGIN_RATE_LIMIT_USER']
+
+
+@login_manager.user_loader
+def load_user(user_id):
+    # Снимок из кеша вместо запроса к базе на каждый запрос (см. user_cache.py)
+    return user_cache.get(user_id)
+
+
+@db.event.listens_for(User, "after_update")
+@db.event.listens_for(User, "after_delete")
+def user_changed(mapper, connection, target):
+    # Смена пароля/роли или удаление — сбрасываем снимок в этом процессе
+    user_cache.invalidate(target.id)
+
+
+def admin_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not current_user.is_authenticated or not current_user.is_admin:
+            abort(403)
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def read_replica(f):
+    # Роут только читает — SELECT можно отправить на реплику (если она задана).
+    # Админ только что мог что-то изменить и должен сразу это увидеть,
+    # поэтому он читает с основной базы
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not (current_user.is_authenticated and current_user.is_admin):
+            use_replica()
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def too_many_attempts(retry_after):
+    return "Слишком много попыток, попробуйте через %d с" % retry_after, 429, {"Retry-After": str(retry_after)}
+
+@bp.app_errorhandler(PasswordHasherBusy)
+def password_hasher_busy(error):
+    # Все потоки хеширования заняты и очередь полна — просим повторить позже
+    return "Сервер перегружен, попробуйте через несколько секунд", 503, {"Retry-After": "5"}
+
+@bp.route("/register", methods=["GET","POST"])
+def register():
+    if request.method == "POST":
+        username = request.form["username"]
+        password = request.form["password"]
+
+        retry_after = login_ip_limiter.hit(request.remote_addr)
+        if retry_after:
+            return too_many_attempts(retry_after)
+
+        if User.query.filter_by(username=username).first():
+            return "Пользователь с таким именем уже существует"
+
+        new_user = User(username=username)
+        new_user.set_password(password)
+        db.session.add(new_user)
+        db.session.commit()
+        return redirect(url_for('auth.login'))
+    return render_template("register.html")
+
+@bp.route("/login", methods=["GET", "POST"])
+def login():
+    if request.method == "POST":
+        username = request.form["username"]
+        password = request.form["password"]
+        # Лимиты проверяются до базы и хеширования: отказ ничего не стоит
+        retry_after = login_ip_limiter.hit(request.remote_addr) or login_user_limiter.blocked(username)
+        if retry_after:
+            return too_many_attempts(retry_after)
+
+        user = User.query.filter_by(username=username).first()
+        if user and user.check_password(password):
+            login_user_limiter.reset(username)
+            if password_hasher.needs_rehash(user.password_hash):
+                user.set_password(password)  # хеш со старыми параметрами — пересчитываем
+                db.session.commit()
+            login_user(user)
+            return redirect(url_for('catalog.index'))
+        login_user_limiter.hit(username)
+        return "неверный логин или пароль"
+    return render_template('login.html')
+
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    return redirect(url_for('catalog.index'))
@@ -0,0 +1,355 @@
+# ====== Нагрузочный тест горячих страниц ======
+#
+# Создаёт отдельную базу instance/bench-<масштаб>.db с синтетическим
+# каталогом (товары, картинки, статьи, пользователи; генератор с фиксированным
+# seed — данные одинаковы от запуска к запуску) и меряет пропускную
+# способность и задержки p50/p90/p99 для /, /cat (фильтры, сортировки,
+# курсорные и OFFSET-страницы), /cat/<id>, /posts и /login.
+#
+#     python bench.py --scale 1k                      # test client Flask, в процессе
+#     python bench.py --scale 100k -o before.json
+#     python bench.py --scale 100k --compare before.json
+#
+# С --url запросы идут по HTTP в несколько потоков к уже запущенному серверу.
+# Сервер должен смотреть в ту же базу:
+#
+#     python bench.py --scale 100k --seed-only
+#     DATABASE_URL=sqlite:///$PWD/instance/bench-100k.db gunicorn -c gunicorn.conf.py wsgi:app
+#     python bench.py --scale 100k --url http://127.0.0.1:8000 --concurrency 16
+#
+# Результат — JSON (stdout или --output), краткая таблица — в stderr.
+# Кеш страниц по умолчанию выключен (меряем саму обработку), --cache включает;
+# для --url это решает конфигурация самого сервера.
+
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import sqlite3
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+SCALES = {"1k": 1000, "10k": 10000, "100k": 100000, "1m": 1000000}
+
+GENRES = ["doom", "black", "thrash", "death", "heavy", "sludge", "stoner",
+          "post-metal", "grind", "power", "speed", "folk"]
+
+BENCH_PASSWORD = "bench-password"
+
+BATCH = 10000
+
+
+def database_path(scale):
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "bench-%s.db" % scale)
+
+
+def load_app(scale, cache):
+    # Модули приложения импортируем только здесь: до этого может не быть instance/
+    from app import create_app
+    return create_app({"SQLALCHEMY_DATABASE_URI": "sqlite:///" + database_path(scale),
+                       "RESPONSE_CACHE_ENABLED": cache})
+
+
+def seed(app, items, rng_seed=42):
+    from sqlalchemy import insert
+
+    from extensions import db
+    from listing import rebuild as rebuild_listing
+    from models import Article, Item, ItemListing, User
+    from search import create_search_index
+
+    rng = random.Random(rng_seed)
+    artists = ["Artist %d" % i for i in range(max(10, min(5000, items // 20)))]
+    now = datetime.utcnow()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        with db.engine.begin() as connection:
+            create_search_index(connection, rebuild=False)  # триггеры заполняют индекс при вставке
+
+        item_rows, image_rows = [], []
+        for item_id in range(1, items + 1):
+            images = ["%02x/%064x.jpg" % (item_id % 256, rng.getrandbits(256)) for _ in range(rng.randint(0, 3))]
+            item_rows.append({
+                "id": item_id,
+                "title": "Album %d" % item_id,
+                "artist": rng.choice(artists),
+                "genre": rng.choice(GENRES),
+                "release_year": rng.randint(1965, 2024),
+                "price": rng.randint(300, 15000),
+                "isActive": rng.random() < 0.85,
+                "text": "Synthetic release %d. " % item_id * 8,
+                "views": int(rng.paretovariate(1.2)) - 1,
+                "created_at": now - timedelta(seconds=rng.randint(0, 3 * 365 * 86400)),
+                "cover_image": images[0] if images else None,
+            })
+            image_rows.extend({"item_id": item_id, "filename": name} for name in images)
+            if len(item_rows) >= BATCH:
+                _flush(db, item_rows, image_rows)
+        _flush(db, item_rows, image_rows)
+
+        articles = max(50, min(10000, items // 100))
+        db.session.execute(insert(Article.__table__), [{
+            "title": "Article %d" % i,
+            "intro": "Intro of article %d" % i,
+            "text": "Body of article %d. " % i * 100,
+            "date": now - timedelta(hours=i),
+        } for i in range(1, articles + 1)])
+
+        for username, is_admin in (("bench-admin", True), ("bench-user", False)):
+            user = User(username=username, is_admin=is_admin)
+            user.set_password(BENCH_PASSWORD)
+            db.session.add(user)
+        db.session.commit()
+        rebuild_listing(db.session, Item.__table__, ItemListing.__table__)
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql("ANALYZE")
+
+
+def _flush(db, item_rows, image_rows):
+    from sqlalchemy import insert
+
+    from models import Item, ItemImage
+
+    if item_rows:
+        db.session.execute(insert(Item.__table__), item_rows)
+    if image_rows:
+        db.session.execute(insert(ItemImage.__table__), image_rows)
+    db.session.commit()
+    del item_rows[:], image_rows[:]
+
+
+def seeded_items(scale):
+    path = database_path(scale)
+    if not os.path.exists(path):
+        return None
+    try:
+        with sqlite3.connect(path) as connection:
+            return connection.execute("SELECT count(*) FROM item").fetchone()[0]
+    except sqlite3.Error:
+        return None
+
+
+def cases(items, rng):
+    # (имя, метод, функция -> путь, данные формы)
+    artist = "Artist %d" % rng.randrange(max(10, min(5000, items // 20)))
+
+    def fixed(path):
+        return lambda: path
+
+    return [
+        ("home", "GET", fixed("/"), None),
+        ("cat", "GET", fixed("/cat"), None),
+        ("cat price_asc", "GET", fixed("/cat?sort=price_asc"), None),
+        ("cat popular active", "GET", fixed("/cat?sort=popular&active=1"), None),
+        ("cat price range", "GET", fixed("/cat?min_price=1000&max_price=3000&sort=price_desc"), None),
+        ("cat facets", "GET", fixed("/cat?" + urllib.parse.urlencode(
+            [("artist", artist), ("genre", "doom"), ("genre", "black"), ("year", "1991")])), None),
+        ("cat cursor page", "GET", None, None),  # путь берётся со страницы /cat, см. run()
+        ("cat offset page 20", "GET", fixed("/cat?page=20"), None),
+        ("item detail", "GET", lambda: "/cat/%d" % rng.randint(1, items), None),
+        ("posts", "GET", fixed("/posts"), None),
+        ("search", "GET", fixed("/search?q=album"), None),
+        ("login", "POST", fixed("/login"), {"username": "bench-user", "password": BENCH_PASSWORD}),
+    ]
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(q / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(name, latencies, errors, wall):
+    return {
+        "name": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / wall, 1) if wall else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p90_ms": round(percentile(latencies, 90) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+class ClientDriver:
+    # Flask test client: один поток, без сети — видна стоимость самого кода
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data):
+        response = self.client.open(path, method=method, data=data)
+        return response.status_code, response.get_data(as_text=True)
+
+    def run(self, method, path_fn, data, count):
+        latencies, errors = [], 0
+        started = time.perf_counter()
+        for _ in range(count):
+            t = time.perf_counter()
+            status, _ = self.request(method, path_fn(), data)
+            latencies.append(time.perf_counter() - t)
+            errors += status >= 400
+        return latencies, errors, time.perf_counter() - started
+
+
+class HttpDriver:
+    # Параллельные HTTP-запросы к запущенному серверу (urllib, без зависимостей)
+
+    def __init__(self, base_url, concurrency):
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        # Редиректы после /login не нужны — меряем сам POST
+        self.opener = urllib.request.build_opener(_NoRedirect)
+
+    def request(self, method, path, data):
+        body = urllib.parse.urlencode(data).encode() if data else None
+        try:
+            with self.opener.open(urllib.request.Request(self.base_url + path, data=body, method=method)) as response:
+                return response.status, response.read().decode("utf-8", "replace")
+        except urllib.error.HTTPError as error:
+            return error.code, ""
+
+    def run(self, method, path_fn, data, count):
+        def one(_):
+            t = time.perf_counter()
+            try:
+                status, _ = self.request(method, path_fn(), data)
+            except OSError:
+                status = 599
+            return time.perf_counter() - t, status >= 400
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(self.concurrency) as pool:
+            results = list(pool.map(one, range(count)))
+        return [r[0] for r in results], sum(r[1] for r in results), time.perf_counter() - started
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+    def http_error_302(self, req, fp, code, msg, headers):
+        return fp
+
+
+def run(driver, items, requests, warmup, only, rng):
+    results = []
+    for name, method, path_fn, data in cases(items, rng):
+        if only and not any(word in name for word in only):
+            continue
+        if path_fn is None:
+            # Вторая страница каталога по курсору из ссылки "Далее" на /cat
+            _, html = driver.request("GET", "/cat", None)
+            match = re.search(r'href="(/cat\?[^"]*cursor=[^"]+)"', html)
+            if not match:
+                continue
+            path_fn = (lambda path: lambda: path)(match.group(1).replace("&amp;", "&"))
+        count = requests // 10 if method == "POST" else requests  # вход дорогой из-за хеширования пароля
+        driver.run(method, path_fn, data, warmup)
+        latencies, errors, wall = driver.run(method, path_fn, data, max(count, 1))
+        result = summarize(name, latencies, errors, wall)
+        results.append(result)
+        print("%-20s %7.1f req/s  p50 %8.2f ms  p99 %8.2f ms  errors %d" % (
+            name, result["rps"], result["p50_ms"], result["p99_ms"], errors), file=sys.stderr)
+    return results
+
+
+def compare(previous, current):
+    before = {r["name"]: r for r in previous["results"]}
+    print("\nСравнение с предыдущим запуском (%s):" % previous["meta"].get("started"), file=sys.stderr)
+    for result in current["results"]:
+        old = before.get(result["name"])
+        if not old:
+            continue
+
+        def change(key):
+            return (result[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+
+        print("%-20s req/s %+6.1f%%  p50 %+6.1f%%  p99 %+6.1f%%" % (
+            result["name"], change("rps"), change("p50_ms"), change("p99_ms")), file=sys.stderr)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест горячих страниц")
+    parser.add_argument("--scale", choices=sorted(SCALES, key=SCALES.get), default="1k")
+    parser.add_argument("--requests", type=int, default=200, help="Запросов на каждый сценарий")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--only", action="append", help="Только сценарии, в имени которых есть строка")
+    parser.add_argument("--reseed", action="store_true", help="Заново создать базу")
+    parser.add_argument("--seed-only", action="store_true", help="Только подготовить базу")
+    parser.add_argument("--cache", action="store_true", help="Включить кеш страниц")
+    parser.add_argument("--url", help="Адрес запущенного сервера (иначе — test client)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Потоков для --url")
+    parser.add_argument("-o", "--output", help="Файл для JSON (иначе — stdout)")
+    parser.add_argument("--compare", help="JSON предыдущего запуска для сравнения")
+    args = parser.parse_args()
+
+    items = SCALES[args.scale]
+    os.makedirs(os.path.dirname(database_path(args.scale)), exist_ok=True)
+    app = load_app(args.scale, args.cache)
+    if args.reseed or seeded_items(args.scale) != items:
+        started = time.perf_counter()
+        print("Заполняю %s (%d товаров)..." % (database_path(args.scale), items), file=sys.stderr)
+        seed(app, items)
+        print("Готово за %.1f с" % (time.perf_counter() - started), file=sys.stderr)
+    if args.seed_only:
+        return
+
+    if args.url:
+        driver = HttpDriver(args.url, args.concurrency)
+    else:
+        driver = ClientDriver(app)
+    report = {
+        "meta": {
+            "started": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "scale": args.scale,
+            "items": items,
+            "driver": "http" if args.url else "test_client",
+            "concurrency": args.concurrency if args.url else 1,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "cache": args.cache,
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+        },
+        "results": run(driver, items, args.requests, args.warmup, args.only, random.Random(7)),
+    }
+    import catalog
+    catalog.view_counter.stop()
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
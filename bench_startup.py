@@ -0,0 +1,163 @@
+# ====== Время старта воркера ======
+#
+# Новый воркер (gunicorn, автоскейлер) до первого ответа импортирует app.py и
+# вызывает create_app() — это время прямо видно в хвосте задержек. Скрипт
+# запускает каждый сценарий в отдельном процессе `python -X importtime`
+# несколько раз и печатает медиану/p90 и самые дорогие импорты:
+#
+#     python bench_startup.py                          # 10 запусков каждого сценария
+#     python bench_startup.py -o before.json
+#     python bench_startup.py --compare before.json --max-ms 600
+#
+# Сценарии: "import" — только импорт app.py, "create_app" — то же, что делает
+# wsgi.py. wall_ms — весь процесс вместе с запуском интерпретатора, app_ms —
+# от первого импорта до готового приложения. Код выхода 1, если при старте
+# импортировались модули, нужные только командам и загрузке картинок
+# (FORBIDDEN), или медиана create_app больше --max-ms.
+
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from bench import git_revision, percentile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+CASES = [
+    ("import", "import app"),
+    ("create_app", "from app import create_app\ncreate_app()"),
+]
+
+# Не должны импортироваться при старте воркера (см. commands.py, images.py)
+FORBIDDEN = ("flask_migrate", "alembic", "PIL")
+
+# Вокруг кода сценария: время в самом процессе, без запуска интерпретатора
+TEMPLATE = "import time\n_started = time.perf_counter()\n%s\nprint(time.perf_counter() - _started)\n"
+
+# Строка -X importtime: "import time:  self [us] | cumulative | имя". Время
+# считаем по self: cumulative пакета включает всё, что он импортирует сам
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+\d+ \| *(\S+)$")
+
+
+def run_once(code):
+    started = time.perf_counter()
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", TEMPLATE % code],
+                             cwd=ROOT, capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if process.returncode:
+        raise SystemExit("Сценарий упал:\n%s" % process.stderr[-2000:])
+    imports = {}  # пакет верхнего уровня -> сумма self по всем его модулям, мкс
+    modules = set()
+    for line in process.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        module = match.group(2)
+        modules.add(module)
+        package = module.split(".")[0]
+        imports[package] = imports.get(package, 0) + int(match.group(1))
+    return wall, float(process.stdout.strip().splitlines()[-1]), imports, modules
+
+
+def forbidden(modules):
+    return sorted(m for m in modules if m.split(".")[0] in FORBIDDEN)
+
+
+def measure(name, code, runs, top):
+    run_once(code)  # прогрев: байткод и файлы в кеше ОС, как у воркера на живом сервере
+    walls, app_times, totals, modules = [], [], {}, set()
+    for _ in range(runs):
+        wall, app_time, imports, loaded = run_once(code)
+        walls.append(wall)
+        app_times.append(app_time)
+        modules |= loaded
+        for package, micros in imports.items():
+            totals.setdefault(package, []).append(micros)
+    slowest = sorted(((percentile(values, 50), package) for package, values in totals.items()), reverse=True)[:top]
+    return {
+        "name": name,
+        "runs": runs,
+        "wall_p50_ms": round(percentile(walls, 50) * 1000, 1),
+        "wall_p90_ms": round(percentile(walls, 90) * 1000, 1),
+        "app_p50_ms": round(percentile(app_times, 50) * 1000, 1),
+        "app_p90_ms": round(percentile(app_times, 90) * 1000, 1),
+        "slowest_imports": [{"package": package, "self_ms": round(micros / 1000.0, 1)}
+                            for micros, package in slowest],
+        "forbidden": forbidden(modules),
+    }
+
+
+def compare(previous, current):
+    before = {r["name"]: r for r in previous["results"]}
+    print("\nСравнение с предыдущим запуском (%s):" % previous["meta"].get("started"), file=sys.stderr)
+    for result in current["results"]:
+        old = before.get(result["name"])
+        if not old:
+            continue
+
+        def change(key):
+            return (result[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+
+        print("%-12s wall p50 %+6.1f%%  app p50 %+6.1f%%" % (
+            result["name"], change("wall_p50_ms"), change("app_p50_ms")), file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Время старта воркера (python -X importtime)")
+    parser.add_argument("--runs", type=int, default=10, help="Запусков каждого сценария")
+    parser.add_argument("--top", type=int, default=10, help="Сколько самых дорогих пакетов показать")
+    parser.add_argument("--max-ms", type=float, help="Предел медианы wall_ms для create_app")
+    parser.add_argument("-o", "--output", help="Файл для JSON (иначе — stdout)")
+    parser.add_argument("--compare", help="JSON предыдущего запуска для сравнения")
+    args = parser.parse_args()
+
+    results = []
+    for name, code in CASES:
+        result = measure(name, code, args.runs, args.top)
+        results.append(result)
+        print("%-12s wall p50 %7.1f ms  p90 %7.1f ms   app p50 %7.1f ms  p90 %7.1f ms" % (
+            name, result["wall_p50_ms"], result["wall_p90_ms"], result["app_p50_ms"], result["app_p90_ms"]),
+            file=sys.stderr)
+        for entry in result["slowest_imports"]:
+            print("    %8.1f ms  %s" % (entry["self_ms"], entry["package"]), file=sys.stderr)
+    report = {
+        "meta": {
+            "started": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "runs": args.runs,
+            "git": git_revision(),
+            "python": platform.python_version(),
+        },
+        "results": results,
+    }
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+    failed = False
+    for result in results:
+        if result["forbidden"]:
+            failed = True
+            print("%s: при старте импортированы %s" % (result["name"], ", ".join(result["forbidden"])), file=sys.stderr)
+    create_app = next(r for r in results if r["name"] == "create_app")
+    if args.max_ms and create_app["wall_p50_ms"] > args.max_ms:
+        failed = True
+        print("create_app: медиана %.1f ms больше %.1f ms" % (create_app["wall_p50_ms"], args.max_ms), file=sys.stderr)
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
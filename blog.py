@@ -0,0 +1,66 @@
+# ====== Блюпринт blog: статьи, Atom-лента и страница "О нас" ======
+
+from datetime import datetime
+
+from flask import Blueprint, current_app, render_template, request
+
+from auth import read_replica
+from data_version import bump as bump_versions
+from database import replica_lagging
+from extensions import db, response_cache
+from models import Article, DataVersion
+from pagination import SortKey, decode_datetime, decode_int, keyset_paginate, keyset_query
+
+bp = Blueprint("blog", __name__)
+
+# Статьи в списке и в ленте: сначала новые, id — разрыв ничьих для курсора
+ARTICLE_SORT = [SortKey(Article.date, desc=True, decode=decode_datetime), SortKey(Article.id, desc=True, decode=decode_int)]
+
+def article_list_query():
+    # Только то, что нужно списку и ленте; text (тело статьи) не читаем
+    return Article.query.options(db.load_only(Article.id, Article.title, Article.intro, Article.date))
+
+
+def articles_changed(article_id=None):
+    replica_lagging()
+    with db.engine.begin() as connection:
+        bump_versions(connection, DataVersion.__table__, "articles")  # ETag API (см. data_version.py)
+    response_cache.invalidate("articles", *(["article:%d" % article_id] if article_id else []))
+
+
+@bp.route('/about')
+@response_cache.cached()
+def about():
+    # Страница "О нас"
+    return render_template("about.html")
+
+
+@bp.route('/posts')
+@read_replica
+@response_cache.cached("articles")
+def posts():
+    # Страница со списком статей: по POSTS_PER_PAGE штук, сначала новые,
+    # следующая страница — по курсору (date, id), полный текст не загружаем
+    pagination = keyset_paginate(article_list_query(), ARTICLE_SORT, cursor=request.args.get("cursor"),
+                                 per_page=current_app.config['POSTS_PER_PAGE'], scope="posts")
+    return render_template("posts.html", articles=pagination.items, pagination=pagination)  # передаём статьи в шаблон
+
+
+@bp.route('/posts/feed.xml')
+@read_replica
+@response_cache.cached("articles")
+def posts_feed():
+    # Atom-лента последних статей из той же облегчённой выборки, что и /posts
+    articles = keyset_query(article_list_query(), ARTICLE_SORT, limit=current_app.config['FEED_SIZE']).all()
+    xml = render_template("feed.xml", articles=articles,
+                          updated=articles[0].date if articles else datetime.utcnow())
+    return current_app.response_class(xml, mimetype="application/atom+xml")
+
+
+@bp.route('/posts/<int:id>')
+@read_replica
+@response_cache.cached("article:{id}")
+def post_detail(id):
+    # Страница отдельной статьи
+    article = Article.query.get(id)  # достаем статью по ID
+    return render_template("post_detail.html", article=article)
@@ -0,0 +1,455 @@
+# ====== Блюпринт catalog: главная, каталог, поиск, страница товара ======
+#
+# Здесь же всё, что каталог держит в памяти процесса (фасеты, статистика цен,
+# данные страниц товаров, рейтинг "Популярное", счётчик просмотров, шина
+# событий для SSE), и items_changed() — сброс этого после изменения товаров
+# (вызывают admin.py и команды flask).
+
+from datetime import datetime, timedelta
+from functools import partial
+
+from flask import Blueprint, Response, abort, current_app, render_template, request
+
+from auth import read_replica
+from data_version import bump as bump_versions
+from database import replica_lagging
+from events import EventBus, EventBusFull, Subscription, fetch as fetch_events, latest_id as latest_event_id, \
+    purge as purge_events, stream as event_stream
+from extensions import db, response_cache
+from facets import FacetCache, build_facets, facet_options, facet_total, parse_years, with_counts
+from models import DataVersion, Item, ItemEvent, ItemListing, ItemRelated, ItemViewDaily
+from pagination import SortKey, decode_datetime, decode_int, keyset_paginate, order_clauses
+from popular import PopularRanking
+from price_stats import PriceStats, price_range, histogram as price_histogram
+from related import RELATED_COUNT, rebuild as rebuild_related
+from response_cache import MemoryBackend
+from search import search_articles, search_items
+from view_counter import ViewCounter
+
+bp = Blueprint("catalog", __name__)
+
+# Ключи сортировки каталога (по витрине item_listing). id в конце — стабильный разрыв ничьих,
+# без него курсорная пагинация теряла бы товары с одинаковой ценой/датой
+CATALOG_SORTS = {
+    "price_asc": [SortKey(ItemListing.price, decode=decode_int), SortKey(ItemListing.id, decode=decode_int)],
+    "price_desc": [SortKey(ItemListing.price, desc=True, decode=decode_int),
+                   SortKey(ItemListing.id, desc=True, decode=decode_int)],
+    "popular": [SortKey(ItemListing.views, desc=True, decode=decode_int),
+                SortKey(ItemListing.id, desc=True, decode=decode_int)],
+    "old": [SortKey(ItemListing.created_at, decode=decode_datetime), SortKey(ItemListing.id, decode=decode_int)],
+    "new": [SortKey(ItemListing.created_at, desc=True, decode=decode_datetime),
+            SortKey(ItemListing.id, desc=True, decode=decode_int)],
+}
+
+# Кеш фасетов каталога (артисты/жанры/годы) без фильтров
+facet_cache = FacetCache()
+# Данные страницы товара (товар, картинки, похожие товары)
+item_detail_cache = MemoryBackend()
+# Минимум, максимум и гистограмма цен для ползунка в каталоге (см. price_stats.py)
+price_stats = PriceStats(lambda: db.session.query(ItemListing.price, ItemListing.isActive,
+                                                  db.func.count(ItemListing.id))
+                         .group_by(ItemListing.price, ItemListing.isActive).all())
+
+# Работают в фоновых потоках и ходят в базу в своём app_context, поэтому
+# создаются в init_app(), когда приложение уже есть
+view_counter = None
+popular_items = None
+item_events = None
+
+
+def init_app(app):
+    global view_counter, popular_items, item_events
+    facet_cache.ttl = app.config['FACET_CACHE_TTL']
+    price_stats.ttl = app.config['FACET_CACHE_TTL']
+    item_detail_cache.max_entries = app.config['ITEM_DETAIL_CACHE_SIZE']
+
+    view_counter = ViewCounter(partial(flush_views, app),
+                               interval=app.config['VIEW_FLUSH_INTERVAL'],
+                               threshold=app.config['VIEW_FLUSH_THRESHOLD'],
+                               max_retries=app.config['VIEW_FLUSH_MAX_RETRIES'])
+    # Готовый рейтинг для главной; пересчитывается после каждой записи просмотров
+    popular_items = PopularRanking(partial(load_popular_items, app), ttl=app.config['POPULAR_REFRESH_SECONDS'])
+    view_counter.listeners.append(lambda increments: popular_items.refresh())
+
+    item_events = EventBus(partial(load_item_events, app), partial(load_latest_event_id, app),
+                           partial(purge_item_events, app),
+                           interval=app.config['EVENTS_POLL_INTERVAL'],
+                           retention=app.config['EVENTS_RETENTION'],
+                           max_subscribers=app.config['EVENTS_MAX_SUBSCRIBERS'])
+
+
+def upsert_daily_views(increments):
+    # INSERT ... SELECT id, день, CASE id ... END FROM item WHERE id IN (...)
+    # ON CONFLICT (item_id, day) DO UPDATE SET views = views + excluded.views.
+    # Строки берутся из item: товар могли удалить, пока его просмотры ждали
+    # в буфере, а внешний ключ на item.id не даст вставить строку для него
+    if db.engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    today = datetime.utcnow().date()
+    rows = (db.select(Item.id, db.literal(today, db.Date), db.case(increments, value=Item.id))
+            .where(Item.id.in_(increments)))
+    stmt = insert(ItemViewDaily).from_select([ItemViewDaily.item_id, ItemViewDaily.day, ItemViewDaily.views], rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ItemViewDaily.item_id, ItemViewDaily.day],
+        set_={"views": ItemViewDaily.views + stmt.excluded.views},
+    )
+    db.session.execute(stmt)
+
+
+def flush_views(app, increments):
+    # Один UPDATE на все накопленные просмотры:
+    # UPDATE item SET views = coalesce(views, 0) + CASE id WHEN 1 THEN 3 WHEN 7 THEN 1 ... END
+    # (и такой же UPDATE витрины item_listing)
+    with app.app_context():
+        for model in (Item, ItemListing):
+            db.session.execute(
+                db.update(model)
+                .where(model.id.in_(increments))
+                .values(views=db.func.coalesce(model.views, 0) + db.case(increments, value=model.id))
+                .execution_options(synchronize_session=False)
+            )
+        upsert_daily_views(increments)
+        bump_versions(db.session, DataVersion.__table__, "views")
+        db.session.commit()
+
+
+def item_card(item):
+    # Всё, что нужно карточке товара в шаблоне, без ORM-объекта
+    return {"id": item.id, "title": item.title, "price": item.price, "cover_image": item.cover_image}
+
+
+def load_popular_items(app):
+    # Топ-N по просмотрам за последние POPULAR_WINDOW_DAYS дней;
+    # если свежих просмотров мало — добираем по общему числу просмотров
+    limit = app.config['POPULAR_ITEMS_COUNT']
+    days = app.config['POPULAR_WINDOW_DAYS']
+    with app.app_context():
+        items = []
+        if days:
+            since = datetime.utcnow().date() - timedelta(days=days - 1)
+            recent = (db.session.query(ItemViewDaily.item_id, db.func.sum(ItemViewDaily.views).label("recent"))
+                      .filter(ItemViewDaily.day >= since)
+                      .group_by(ItemViewDaily.item_id)
+                      .subquery())
+            items = (ItemListing.query.join(recent, recent.c.item_id == ItemListing.id)
+                     .order_by(recent.c.recent.desc(), ItemListing.id.desc())
+                     .limit(limit).all())
+        if len(items) < limit:
+            query = ItemListing.query.order_by(ItemListing.views.desc(), ItemListing.id.desc())
+            if items:
+                query = query.filter(ItemListing.id.notin_([i.id for i in items]))
+            items += query.limit(limit - len(items)).all()
+        return [item_card(item) for item in items]
+
+
+def bump_version(*names):
+    # Новый номер — новый ETag API во всех воркерах (см. data_version.py)
+    with db.engine.begin() as connection:
+        bump_versions(connection, DataVersion.__table__, *names)
+
+
+def items_changed(item_id=None):
+    # Товар создан, изменён или удалён — сбрасываем всё, что от него зависит
+    replica_lagging()
+    bump_version("items")
+    facet_cache.invalidate()  # списки артистов/жанров/годов могли измениться
+    popular_items.invalidate()
+    if not item_id:
+        price_stats.invalidate()  # массовое изменение — пересчитаем при следующем показе
+    response_cache.invalidate("items", *(["item:%d" % item_id] if item_id else []))
+    if item_id:
+        item_detail_cache.delete(item_id)
+    else:
+        item_detail_cache.clear()
+
+
+def item_removed(item_id):
+    # Товар удалён: его просмотры из буфера писать уже некуда
+    view_counter.discard(item_id)
+    items_changed(item_id)
+
+
+def item_pages_changed(item_ids):
+    # Сменились только блоки "похожие товары" на страницах этих товаров
+    replica_lagging()
+    bump_version("items")
+    response_cache.invalidate(*["item:%d" % item_id for item_id in item_ids])
+    for item_id in item_ids:
+        item_detail_cache.delete(item_id)
+
+
+def update_related(item_ids):
+    # Пересчёт похожих товаров после COMMIT (ids — из related_affected)
+    rebuild_related(db.session, ItemListing, ItemRelated, item_ids)
+    db.session.commit()
+    item_pages_changed(item_ids)
+
+
+def item_detail_data(item_id):
+    # Всё для страницы товара одним словарём: в кеше — ноль запросов,
+    # иначе два (товар с картинками одним JOIN и карточки похожих товаров)
+    data = item_detail_cache.get(item_id)
+    if data is not None:
+        return data
+    item = db.session.get(Item, item_id, options=[db.joinedload(Item.images)])
+    if item is None:
+        return None
+    related = (db.session.query(ItemListing.id, ItemListing.title, ItemListing.price, ItemListing.cover_image)
+               .join(ItemRelated, ItemRelated.related_id == ItemListing.id)
+               .filter(ItemRelated.item_id == item_id)
+               .order_by(ItemRelated.score.desc())
+               .limit(RELATED_COUNT))
+    data = {
+        "id": item.id, "title": item.title, "price": item.price, "text": item.text,
+        "artist": item.artist, "genre": item.genre, "release_year": item.release_year,
+        "isActive": item.isActive, "images": [img.filename for img in item.images],
+        "related": [item_card(card) for card in related],
+    }
+    item_detail_cache.set(item_id, data, current_app.config['ITEM_DETAIL_CACHE_TTL'])
+    return data
+
+
+def filter_catalog(query, active=False, min_price=None, max_price=None):
+    # min_price/max_price — уже разобранные числа (price_range) или None
+    # Фильтры каталога, не связанные с фасетами
+    if active:
+        query = query.filter(ItemListing.isActive == True)
+    if min_price is not None:
+        query = query.filter(ItemListing.price >= min_price)
+    if max_price is not None:
+        query = query.filter(ItemListing.price <= max_price)
+    return query
+
+
+def filter_facets(query, artists=(), genres=(), years=()):
+    # Множественный выбор (используем .in_)
+    if artists:
+        query = query.filter(ItemListing.artist.in_(artists))
+    if genres:
+        query = query.filter(ItemListing.genre.in_(genres))
+    if years:
+        # years — уже числа (facets.parse_years)
+        query = query.filter(ItemListing.release_year.in_(years))
+    return query
+
+
+def facet_query(query):
+    # Один проход по товарам: сочетания (артист, жанр, год) и их количество
+    return (query.with_entities(ItemListing.artist, ItemListing.genre, ItemListing.release_year,
+                                db.func.count(ItemListing.id))
+            .group_by(ItemListing.artist, ItemListing.genre, ItemListing.release_year))
+
+
+def facet_rows(query):
+    return facet_query(query).all()
+
+
+def price_summary(active, artists_selected=(), genres_selected=(), years_selected=()):
+    # Без фасетов — из памяти; с выбранными артистами/жанрами/годами — один
+    # сгруппированный запрос по ix_item_facets. Фильтр цены не учитывается:
+    # ползунок показывает весь диапазон
+    if not (artists_selected or genres_selected or years_selected):
+        return price_stats.summary(active)
+    query = filter_facets(filter_catalog(ItemListing.query, active), artists_selected, genres_selected, years_selected)
+    rows = query.with_entities(ItemListing.price, db.func.count(ItemListing.id)).group_by(ItemListing.price)
+    return price_histogram(dict(rows.all()))
+
+
+def _price_key(price, active):
+    # isActive по умолчанию True (default колонки)
+    return int(price), True if active is None else bool(active)
+
+
+def record_price_change(target, old, new):
+    # В статистику цен изменение попадёт только после COMMIT
+    if old != new:
+        db.inspect(target).session.info.setdefault("price_changes", []).append((old, new))
+
+
+@db.event.listens_for(Item, "after_insert")
+def item_inserted(mapper, connection, target):
+    record_price_change(target, None, _price_key(target.price, target.isActive))
+
+
+@db.event.listens_for(Item, "after_update")
+def item_updated(mapper, connection, target):
+    attrs = db.inspect(target).attrs
+    price = attrs.price.history.deleted or [target.price]
+    active = attrs.isActive.history.deleted or [target.isActive]
+    record_price_change(target, _price_key(price[0], active[0]), _price_key(target.price, target.isActive))
+
+
+@db.event.listens_for(Item, "after_delete")
+def item_deleted(mapper, connection, target):
+    record_price_change(target, _price_key(target.price, target.isActive), None)
+
+
+@db.event.listens_for(db.session, "after_commit")
+def apply_price_changes(session):
+    for old, new in session.info.pop("price_changes", ()):
+        price_stats.apply(old, new)
+
+
+@db.event.listens_for(db.session, "after_soft_rollback")
+def drop_price_changes(session, previous_transaction):
+    session.info.pop("price_changes", None)
+
+
+def load_item_events(app, after_id, ids=()):
+    # Фоновый поток шины событий: своё app_context — своя сессия
+    with app.app_context():
+        return fetch_events(db.session, ItemEvent.__table__, after_id, ids)
+
+
+def load_latest_event_id(app):
+    with app.app_context():
+        return latest_event_id(db.session, ItemEvent.__table__)
+
+
+def purge_item_events(app, retention):
+    with app.app_context():
+        purge_events(db.session, ItemEvent.__table__, retention)
+
+
+@bp.route('/')
+@bp.route('/home')
+@read_replica
+@response_cache.cached("items")
+def index():
+    # Главная страница; рейтинг уже посчитан заранее
+    return render_template("index.html", popular_items = popular_items.get())  # отображаем index.html
+
+
+@bp.route('/cat')
+@read_replica
+@response_cache.cached("items")
+def cat():
+    # 1. Получаем параметры из URL
+    sort = request.args.get("sort")
+    filter_active = request.args.get("active")
+    # Границы цены разбираются до запроса: мусор игнорируется, "от" > "до" меняются местами
+    min_price, max_price = price_range(request.args.get("min_price"), request.args.get("max_price"))
+
+    # Получаем списки выбранных значений (checkbox)
+    # Используем названия 'artist', 'genre', 'year' как в атрибуте name="..." в HTML
+    artists_selected = request.args.getlist("artist")
+    genres_selected = request.args.getlist("genre")
+    years_selected = parse_years(request.args.getlist("year"))  # "abc" и т.п. отбрасываются
+
+    page = request.args.get('page', 1, type=int)
+    per_page = 40
+
+    # 2-3. Запрос к базе + ФИЛЬТРАЦИЯ (активность и цена — они влияют и на счётчики фасетов)
+    query = filter_catalog(ItemListing.query, filter_active == '1', min_price, max_price)
+
+    # 4. ФАСЕТЫ: все значения для выпадающих списков + счётчики под текущие фильтры.
+    # Один сгруппированный запрос вместо трёх DISTINCT; без фильтров берём из кеша
+    base_rows = facet_cache.get(lambda: facet_rows(ItemListing.query))
+    if filter_active == '1' or min_price is not None or max_price is not None:
+        rows = facet_rows(query)
+    else:
+        rows = base_rows
+    options = facet_options(base_rows)
+    counts = build_facets(rows, artists_selected, genres_selected, years_selected)
+
+    # Множественный выбор артистов/жанров/годов
+    query = filter_facets(query, artists_selected, genres_selected, years_selected)
+
+    # 5. СОРТИРОВКА + ПАГИНАЦИЯ
+    keys = CATALOG_SORTS.get(sort, CATALOG_SORTS["new"])
+    # Количество товаров берём из счётчиков фасетов — без отдельного COUNT(*)
+    total = facet_total(counts, artists_selected)
+
+    if current_app.config["CATALOG_PAGINATION"] == "keyset" and "page" not in request.args:
+        # Курсор вместо OFFSET: каждая следующая страница стоит столько же, сколько первая
+        pagination = keyset_paginate(query, keys, cursor=request.args.get("cursor"),
+                                     per_page=per_page, scope=sort or "new", total=total)
+    else:
+        # Старые ссылки вида ?page=N продолжают работать через OFFSET
+        pagination = query.order_by(*order_clauses(keys)).paginate(
+            page = page, per_page = per_page, error_out = False, count = False)
+        pagination.total = total
+    items = pagination.items
+    # Параметры URL для ссылок пагинации (списки артистов/жанров/годов сохраняются целиком)
+    page_args = {k: v for k, v in request.args.lists() if k not in ("page", "cursor")}
+    prices = price_summary(filter_active == '1', artists_selected, genres_selected, years_selected)
+    # 6. Передаем всё в шаблон
+    return render_template(
+        "cat.html",
+        items=items,
+        sort=sort,
+        filter_active=filter_active,
+        artists=with_counts(options["artist"], counts["artist"]),  # Все артисты со счётчиками
+        genres=with_counts(options["genre"], counts["genre"]),     # Все жанры со счётчиками
+        years=with_counts(options["year"], counts["year"]),        # Все годы со счётчиками
+        artists_selected=artists_selected, # Выбранные пользователем
+        genres_selected=genres_selected,
+        years_selected=years_selected,
+        pagination=pagination,
+        page_args=page_args,
+        prices=prices,  # гистограмма цен для ползунка
+        min_price=min_price,
+        max_price=max_price
+    )
+@bp.route('/search')
+@read_replica
+@response_cache.cached("items", "articles")
+def search():
+    # Поиск по товарам и статьям (индекс FTS5, ранжирование bm25)
+    q = request.args.get("q", "").strip()
+    limit = current_app.config['SEARCH_RESULTS_LIMIT']
+    items = search_items(db.session, q, limit) if q else []
+    articles = search_articles(db.session, q, limit) if q else []
+    return render_template("search.html", q=q, items=items, articles=articles)
+
+
+@bp.route('/cat/<int:id>')
+@read_replica
+@response_cache.cached("item:{id}", on_hit=lambda id: view_counter.hit(id))
+def item_detail(id):
+    # Страница отдельного товара
+    item = item_detail_data(id)  # товар, картинки и похожие — из памяти, если уже загружались
+    if item is None:
+        abort(404)
+    view_counter.hit(id)  # просмотр запишется в базу вместе с остальными
+    return render_template("item_detail.html", item=item, related=item["related"])
+
+
+def item_event_stream(subscription):
+    # Ответ text/event-stream для подписки (см. events.py). Соединение с базой
+    # потоку не нужно — возвращаем его в пул до начала стрима
+    if not current_app.config['EVENTS_ENABLED']:
+        abort(404)  # обычный воркер gthread: поток на 5 минут ради одного подписчика — слишком дорого
+    last_event_id = request.headers.get("Last-Event-ID", "")
+    try:
+        item_events.subscribe(subscription, int(last_event_id) if last_event_id.isdigit() else None)
+    except EventBusFull:
+        return "Слишком много подписок на события, попробуйте позже", 503, {"Retry-After": "30"}
+    db.session.close()
+    config = current_app.config
+    response = Response(event_stream(subscription, heartbeat=config['EVENTS_HEARTBEAT'],
+                                     coalesce=config['EVENTS_COALESCE'],
+                                     lifetime=config['EVENTS_STREAM_LIFETIME']),
+                        mimetype="text/event-stream")
+    # Отписка, даже если клиент ушёл раньше, чем начался стрим
+    response.call_on_close(lambda: item_events.unsubscribe(subscription))
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # nginx не должен копить события
+    # Сервис событий может стоять на другом адресе (EVENTS_URL); данные публичные
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    return response
+
+
+@bp.route('/cat/<int:id>/events')
+def item_detail_events(id):
+    # Изменения цены и наличия одного товара
+    return item_event_stream(Subscription(items=[id]))
+
+
+@bp.route('/events/items')
+def items_events():
+    # ?item=5&item=7&artist=...&genre=... — любое совпадение; без параметров — все товары
+    items = [int(value) for value in request.args.getlist("item") if value.isdigit()]
+    return item_event_stream(Subscription(items, request.args.getlist("artist"), request.args.getlist("genre")))
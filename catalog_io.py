@@ -0,0 +1,224 @@
+# ====== Массовый импорт и экспорт каталога ======
+#
+# Используется командами `flask catalog import` и `flask catalog export`.
+# Формат — CSV (картинки через "|") или JSON Lines (картинки списком):
+#
+#     title,artist,release_year,genre,price,isActive,text,images
+#     Paranoid,Black Sabbath,1970,heavy,3500,1,...,3f/3fa4...c1.jpg|9b/9b0e...44.jpg
+#
+#     {"title": "Paranoid", "artist": "Black Sabbath", ..., "images": ["3f/3fa4...c1.jpg"]}
+#
+# Товар определяется естественным ключом (artist, title, release_year): если
+# такой уже есть — он обновляется, иначе добавляется. Файлы читаются и пишутся
+# потоком, записи идут пачками: на пачку один SELECT существующих ключей,
+# один executemany на INSERT, один на UPDATE и одна транзакция.
+#
+# Картинки — имена файлов в UPLOAD_FOLDER (как в ItemImage.filename), сами
+# файлы не копируются. Если поле images пустое — картинки товара не меняются.
+
+import csv
+import json
+
+from sqlalchemy import bindparam, delete, insert, select, update
+
+from listing import refresh as refresh_listing
+
+FIELDS = ("title", "artist", "release_year", "genre", "price", "isActive", "text", "images")
+
+KEY = ("artist", "title", "release_year")
+
+_TRUE = {"1", "true", "yes", "y", "да"}
+_FALSE = {"0", "false", "no", "n", "нет", ""}
+
+
+class CatalogFormatError(ValueError):
+    pass
+
+
+def _key(row):
+    return tuple(row[name] for name in KEY)
+
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    value = str(value).strip().lower()
+    if value in _TRUE:
+        return True
+    if value in _FALSE:
+        return False
+    raise ValueError("ожидалось 1/0, true/false: %r" % value)
+
+
+def _parse_images(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [name.strip() for name in value.split("|") if name.strip()]
+    return [str(name) for name in value if name]
+
+
+def clean_row(raw):
+    # Строка файла -> словарь с полями Item и списком картинок
+    row = {}
+    for name in ("title", "artist", "genre", "text"):
+        value = str(raw.get(name) or "").strip()
+        if not value and name != "text":
+            raise ValueError("пустое поле %s" % name)
+        row[name] = value
+    row["price"] = int(raw.get("price"))
+    row["release_year"] = int(raw.get("release_year"))
+    row["isActive"] = _parse_bool(raw.get("isActive", True))
+    row["images"] = _parse_images(raw.get("images"))
+    if row["price"] < 0:
+        raise ValueError("отрицательная цена")
+    return row
+
+
+def read_rows(stream, fmt):
+    # Генератор (номер строки, словарь); ошибки в данных — с номером строки
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        lines = ((reader.line_num, raw) for raw in reader)
+    else:
+        lines = ((number, line) for number, line in enumerate(stream, 1) if line.strip())
+    for number, raw in lines:
+        try:
+            yield number, clean_row(raw if fmt == "csv" else json.loads(raw))
+        except (TypeError, ValueError) as error:
+            raise CatalogFormatError("строка %d: %s" % (number, error)) from None
+
+
+def chunked(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _existing_ids(session, item_model, keys):
+    # {(artist, title, release_year): id} для товаров с этими ключами;
+    # ищем по artist — это первая колонка индекса ix_item_facets
+    artists = {key[0] for key in keys}
+    found = {}
+    for item_id, artist, title, year in session.execute(
+            select(item_model.id, item_model.artist, item_model.title, item_model.release_year)
+            .where(item_model.artist.in_(artists))):
+        found[(artist, title, year)] = item_id
+    return found
+
+
+def _update_by_id(session, table, rows):
+    # UPDATE ... WHERE id = ? одним executemany на каждый набор колонок
+    # (строки с картинками меняют ещё и cover_image). ORM-вариант
+    # session.execute(update(Item), rows) в SQLite выполняет строки по одной.
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    for columns, group in groups.items():
+        stmt = (update(table).where(table.c.id == bindparam("_id"))
+                .values({name: bindparam(name) for name in columns if name != "id"}))
+        session.execute(stmt, [dict(row, _id=row["id"]) for row in group])
+
+
+def import_chunk(session, item_model, image_model, rows, listing_model=None):
+    # Одна пачка в одной транзакции. Возвращает (добавлено, обновлено).
+    # Повтор ключа внутри пачки — побеждает последняя строка.
+    # listing_model — витрина каталога (listing.py), обновляется в той же транзакции.
+    by_key = {}
+    for row in rows:
+        by_key[_key(row)] = row
+
+    existing = _existing_ids(session, item_model, by_key)
+
+    new_rows, changed_rows, images = [], [], {}
+    for key, row in by_key.items():
+        values = {name: row[name] for name in FIELDS if name != "images"}
+        if key in existing:
+            values["id"] = existing[key]
+            if row["images"]:
+                values["cover_image"] = row["images"][0]
+                images[existing[key]] = row["images"]
+            changed_rows.append(values)
+        else:
+            # У всех строк executemany должен быть одинаковый набор колонок
+            values["cover_image"] = row["images"][0] if row["images"] else None
+            new_rows.append(values)
+
+    changed_ids = [row["id"] for row in changed_rows]
+    if changed_rows:
+        _update_by_id(session, item_model.__table__, changed_rows)
+        if images:
+            session.execute(delete(image_model).where(image_model.item_id.in_(list(images))))
+    if new_rows:
+        # INSERT без RETURNING: так это настоящий executemany; id новых товаров
+        # с картинками добираем вторым SELECT по тем же ключам
+        session.execute(insert(item_model.__table__), new_rows)
+        # Витрине нужны id всех новых товаров, картинкам — только тех, что с картинками
+        wanted = {_key(row) for row in new_rows if listing_model is not None or row["cover_image"]}
+        if wanted:
+            for key, item_id in _existing_ids(session, item_model, wanted).items():
+                if key not in wanted:
+                    continue
+                if by_key[key]["images"]:
+                    images[item_id] = by_key[key]["images"]
+                if listing_model is not None:
+                    changed_ids.append(item_id)
+
+    image_rows = [{"item_id": item_id, "filename": filename}
+                  for item_id, filenames in images.items() for filename in filenames]
+    if image_rows:
+        session.execute(insert(image_model), image_rows)
+    if listing_model is not None:
+        refresh_listing(session, item_model.__table__, listing_model.__table__, changed_ids)
+    session.commit()
+    return len(new_rows), len(changed_rows)
+
+
+def export_rows(session, item_model, image_model, batch_size=1000):
+    # Товары по id вместе с картинками; в памяти не больше одной пачки
+    last_id = 0
+    while True:
+        items = session.execute(
+            select(item_model).where(item_model.id > last_id).order_by(item_model.id).limit(batch_size)
+        ).scalars().all()
+        if not items:
+            return
+        filenames = {}
+        for item_id, filename in session.execute(
+                select(image_model.item_id, image_model.filename)
+                .where(image_model.item_id.in_([item.id for item in items]))
+                .order_by(image_model.item_id, image_model.id)):
+            filenames.setdefault(item_id, []).append(filename)
+        for item in items:
+            row = {name: getattr(item, name) for name in FIELDS if name != "images"}
+            row["isActive"] = bool(row["isActive"])
+            row["images"] = filenames.get(item.id, [])
+            yield row
+        last_id = items[-1].id
+        session.expunge_all()
+
+
+def write_rows(rows, stream, fmt):
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(stream, fieldnames=FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(dict(row, isActive=int(row["isActive"]), images="|".join(row["images"])))
+            count += 1
+    else:
+        for row in rows:
+            stream.write(json.dumps(row, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def detect_format(filename, fmt=None):
+    if fmt:
+        return fmt
+    return "jsonl" if filename.endswith((".jsonl", ".json", ".ndjson")) else "csv"
@@ -0,0 +1,215 @@
+# ====== Команды для консоли (flask ...) ======
+#
+# Регистрируются в create_app() (app.py) через init_app(). Flask-Migrate и
+# Alembic нужны только командам `flask db ...`, поэтому группа db импортирует
+# их при первом обращении, а не при старте каждого воркера.
+
+import time
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import AppGroup, ScriptInfo, with_appcontext
+
+from admin import reconcile_images
+from blog import ARTICLE_SORT, article_list_query
+from catalog import CATALOG_SORTS, bump_version, facet_query, filter_catalog, filter_facets, item_detail_cache, \
+    items_changed
+from catalog_io import CatalogFormatError, chunked, detect_format, export_rows, import_chunk, read_rows, write_rows
+from extensions import db
+from listing import check as check_listing, rebuild as rebuild_listing
+from models import Item, ItemImage, ItemListing, ItemRelated
+from pagination import keyset_query
+from query_plans import catalog_cases, explain, full_scans
+from related import rebuild as rebuild_related
+from search import create_search_index, is_search_table
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    # flask db migrate не должен предлагать удалить таблицы и индексы полнотекстового поиска
+    return not (type_ in ("table", "index") and reflected and is_search_table(name))
+
+
+class MigrateGroup(click.Group):
+    # `flask db ...` из Flask-Migrate. Пока команду не вызвали, Flask-Migrate
+    # и Alembic не импортируются; `flask --help` их тоже не трогает
+
+    def make_context(self, info_name, args, parent=None, **extra):
+        from flask_migrate import Migrate
+        from flask_migrate.cli import db as db_group
+        app = parent.ensure_object(ScriptInfo).load_app()
+        if "migrate" not in app.extensions:
+            Migrate(app, db, include_object=include_object)
+        # Дальше — настоящая группа: её опции (--directory и т.д.) и команды
+        return db_group.make_context(info_name, args, parent=parent, **extra)
+
+
+db_cli = MigrateGroup("db", help="Миграции базы данных (Flask-Migrate / Alembic)")
+
+
+@click.command("check-query-plans")
+@click.option("--verbose", is_flag=True, help="Печатать план каждого запроса")
+@with_appcontext
+def check_query_plans(verbose):
+    # Прогоняет EXPLAIN QUERY PLAN по всем сочетаниям фильтров/сортировок каталога
+    # и по запросам статей; код выхода 1, если какой-то запрос читает таблицу целиком
+    if db.engine.dialect.name != "sqlite":
+        click.echo("EXPLAIN QUERY PLAN есть только в SQLite — проверка пропущена")
+        return
+    statements = []
+    for base, facets, sort, seek in catalog_cases(CATALOG_SORTS):
+        query = filter_facets(filter_catalog(ItemListing.query, *base), *facets)
+        keys = CATALOG_SORTS[sort]
+        values = [datetime.utcnow() if key.column is ItemListing.created_at else 0 for key in keys] if seek else None
+        label = "cat active=%s price=%s-%s facets=%s sort=%s seek=%s" % (base + (facets, sort, seek))
+        statements.append((label, keyset_query(query, keys, values, limit=41).statement))
+    for base in set(case[0] for case in catalog_cases(CATALOG_SORTS)):
+        statements.append(("facets active=%s price=%s-%s" % base,
+                           facet_query(filter_catalog(ItemListing.query, *base)).statement))
+    statements.append(("posts", keyset_query(article_list_query(), ARTICLE_SORT, limit=11).statement))
+    statements.append(("posts seek", keyset_query(article_list_query(), ARTICLE_SORT,
+                                                  [datetime.utcnow(), 0], limit=11).statement))
+    statements.append(("item images", ItemImage.query.filter_by(item_id=1).statement))
+    statements.append(("item related", db.session.query(ItemListing.id, ItemListing.title, ItemListing.price,
+                                        ItemListing.cover_image)
+                       .join(ItemRelated, ItemRelated.related_id == ItemListing.id)
+                       .filter(ItemRelated.item_id == 1).order_by(ItemRelated.score.desc()).statement))
+    statements.append(("related referrers", ItemRelated.query.filter_by(related_id=1).statement))
+
+    tables = {"item", "item_listing", "item_image", "item_related", "article"}
+    failed = 0
+    with db.engine.connect() as connection:
+        for label, statement in statements:
+            plan = explain(connection, statement)
+            scans = full_scans(plan, tables)
+            if scans:
+                failed += 1
+                click.echo("FULL SCAN  %s: %s" % (label, "; ".join(scans)))
+            elif verbose:
+                click.echo("ok         %s: %s" % (label, "; ".join(plan)))
+    click.echo("%d запросов проверено, %d с полным сканированием" % (len(statements), failed))
+    if failed:
+        raise SystemExit(1)
+
+
+@click.command("templates-compile")
+@with_appcontext
+def templates_compile():
+    # Заранее заполняет кеш байткода шаблонов (например, при сборке образа)
+    from app import warm_templates
+    started = time.perf_counter()
+    names = warm_templates(current_app)
+    click.echo("Скомпилировано шаблонов: %d за %.2f с" % (len(names), time.perf_counter() - started))
+
+
+@click.command("related-index")
+@click.option("--batch-size", default=500, show_default=True)
+@with_appcontext
+def related_index(batch_size):
+    # Полная перестройка похожих товаров (после массового импорта и т.п.)
+    started = time.perf_counter()
+    ids = [row.id for row in db.session.query(Item.id).order_by(Item.id)]
+    for start in range(0, len(ids), batch_size):
+        rebuild_related(db.session, ItemListing, ItemRelated, ids[start:start + batch_size])
+        db.session.commit()
+    item_detail_cache.clear()
+    bump_version("items")
+    click.echo("Похожие товары пересчитаны для %d товаров за %.1f с" % (len(ids), time.perf_counter() - started))
+
+
+@click.command("search-index")
+@with_appcontext
+def search_index():
+    # Создаёт таблицы FTS5 и триггеры (если их нет) и перестраивает индекс поиска
+    with db.engine.begin() as connection:
+        create_search_index(connection)
+    click.echo("Индекс поиска перестроен")
+
+
+@click.command("images-reconcile")
+@click.option("--dry-run", is_flag=True, help="Только показать, что будет удалено")
+@with_appcontext
+def images_reconcile(dry_run):
+    # Разовый запуск той же очистки, что делает фоновый поток
+    removed = reconcile_images(current_app._get_current_object(), dry_run=dry_run)
+    for filename in removed:
+        click.echo(filename)
+    click.echo("%s файлов: %d" % ("Найдено неиспользуемых" if dry_run else "Удалено", len(removed)))
+
+
+catalog_cli = AppGroup("catalog", help="Массовый импорт и экспорт товаров (CSV / JSON Lines)")
+
+
+@catalog_cli.command("import")
+@click.argument("source", type=click.File("r", encoding="utf-8"))
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), help="По умолчанию — по расширению файла")
+@click.option("--batch-size", default=1000, show_default=True, help="Записей в одной транзакции")
+def catalog_import(source, fmt, batch_size):
+    # Добавляет новые товары и обновляет существующие (ключ — артист, название, год)
+    fmt = detect_format(source.name, fmt)
+    inserted = updated = 0
+    started = time.perf_counter()
+    try:
+        rows = (row for _, row in read_rows(source, fmt))
+        for chunk in chunked(rows, batch_size):
+            added, changed = import_chunk(db.session, Item, ItemImage, chunk, listing_model=ItemListing)
+            inserted += added
+            updated += changed
+            elapsed = time.perf_counter() - started
+            click.echo("%d записей, %.0f зап/с" % (inserted + updated, (inserted + updated) / elapsed), err=True)
+    except CatalogFormatError as error:
+        db.session.rollback()
+        raise click.ClickException("%s (уже сохранено: %d)" % (error, inserted + updated))
+    finally:
+        if inserted or updated:
+            items_changed()
+            click.echo("Похожие товары для новых записей: flask related-index", err=True)
+    elapsed = time.perf_counter() - started
+    click.echo("Добавлено: %d, обновлено: %d за %.1f с (%.0f зап/с)" % (
+        inserted, updated, elapsed, (inserted + updated) / elapsed if elapsed else 0))
+
+
+@catalog_cli.command("export")
+@click.argument("target", type=click.File("w", encoding="utf-8"), default="-")
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), help="По умолчанию — по расширению файла")
+@click.option("--batch-size", default=1000, show_default=True, help="Товаров в одном запросе")
+def catalog_export(target, fmt, batch_size):
+    # Пишет все товары с именами файлов картинок; без аргумента — в stdout
+    fmt = detect_format(target.name, fmt)
+    started = time.perf_counter()
+    count = write_rows(export_rows(db.session, Item, ItemImage, batch_size), target, fmt)
+    elapsed = time.perf_counter() - started
+    click.echo("Выгружено: %d за %.1f с (%.0f зап/с)" % (count, elapsed, count / elapsed if elapsed else 0), err=True)
+
+
+listing_cli = AppGroup("listing", help="Витрина каталога item_listing (см. listing.py)")
+
+
+@listing_cli.command("rebuild")
+def listing_rebuild():
+    # Пересобирает витрину из item (после ручных правок базы, восстановления и т.п.)
+    started = time.perf_counter()
+    count = rebuild_listing(db.session, Item.__table__, ItemListing.__table__)
+    items_changed()
+    click.echo("Витрина пересобрана: %d товаров за %.1f с" % (count, time.perf_counter() - started))
+
+
+@listing_cli.command("check")
+@click.option("--limit", default=20, show_default=True, help="Сколько id расхождений показать")
+def listing_check(limit):
+    # Сравнивает витрину с item; код выхода 1, если есть расхождения
+    stale, extra = check_listing(db.session, Item.__table__, ItemListing.__table__, limit)
+    if stale:
+        click.echo("Нет в витрине или устарели: %s" % ", ".join(map(str, stale)))
+    if extra:
+        click.echo("Лишние в витрине: %s" % ", ".join(map(str, extra)))
+    if stale or extra:
+        click.echo("Исправить: flask listing rebuild")
+        raise SystemExit(1)
+    click.echo("Витрина совпадает с item")
+
+
+def init_app(app):
+    for command in (db_cli, check_query_plans, templates_compile, related_index, search_index,
+                    images_reconcile, catalog_cli, listing_cli):
+        app.cli.add_command(command)
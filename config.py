@@ -0,0 +1,131 @@
+# ====== Настройки приложения ======
+# create_app() загружает этот модуль целиком (app.config.from_object), а затем
+# переопределения из аргумента config — так bench.py и разовые скрипты меняют
+# отдельные значения, не трогая окружение.
+
+import os
+
+from database import REPLICA, database_url, engine_options
+
+SECRET_KEY = '}WW?9vP]]&YK!,D2.CK~m+az3VipL2V%8?o\$NO>'
+
+# ====== Настройки базы данных ======
+# По умолчанию SQLite файл blog.db; DATABASE_URL в окружении — другая база
+# (PostgreSQL или отдельный файл SQLite, например для bench.py), см. database.py
+SQLALCHEMY_DATABASE_URI = database_url(os.environ.get("DATABASE_URL"))
+SQLALCHEMY_TRACK_MODIFICATIONS = False  # отключаем лишние уведомления
+# Пул соединений под число потоков в воркере (WEB_THREADS, как в gunicorn.conf.py)
+SQLALCHEMY_ENGINE_OPTIONS = engine_options(int(os.environ.get("WEB_THREADS", 4)), SQLALCHEMY_DATABASE_URI)
+# Реплика только для чтения (DATABASE_REPLICA_URL): на неё идут SELECT роутов с @read_replica
+if os.environ.get("DATABASE_REPLICA_URL"):
+    replica_url = database_url(os.environ["DATABASE_REPLICA_URL"])
+    SQLALCHEMY_BINDS = {
+        REPLICA: dict(engine_options(int(os.environ.get("WEB_THREADS", 4)), replica_url), url=replica_url),
+    }
+# Сколько секунд после изменения товаров/статей читать с основной базы: кеши,
+# сброшенные записью, не должны заполниться с отстающей реплики (см. database.py).
+# Должно быть не меньше реального отставания реплики
+REPLICA_MAX_LAG = float(os.environ.get("REPLICA_MAX_LAG", 5))
+# Дополнительные/переопределённые PRAGMA для SQLite (см. database.py)
+SQLITE_PRAGMAS = {}
+
+# ====== Картинки товаров ======
+UPLOAD_FOLDER = 'static/images'
+# Сколько потоков делают уменьшенные копии картинок (thumb/medium, WebP)
+IMAGE_WORKERS = 2
+# Максимальный размер запроса (все загружаемые файлы вместе), больше — ответ 413
+MAX_CONTENT_LENGTH = 64 * 1024 * 1024
+# Как часто искать и удалять файлы, на которые не ссылается ни один товар (сек, 0 — никогда),
+# и сколько секунд не трогать только что появившиеся файлы
+IMAGE_RECONCILE_INTERVAL = 3600
+IMAGE_RECONCILE_GRACE = 3600
+
+# Просмотры товаров копятся в памяти и пишутся в базу пачкой:
+# раз в VIEW_FLUSH_INTERVAL секунд (0 — писать сразу) или по набору VIEW_FLUSH_THRESHOLD
+VIEW_FLUSH_INTERVAL = 5.0
+VIEW_FLUSH_THRESHOLD = 500
+# Сколько сбросов подряд пробовать записать просмотры товара, прежде чем отбросить их
+VIEW_FLUSH_MAX_RETRIES = 5
+
+# Блок "Популярное" на главной: сколько товаров показывать, за сколько
+# последних дней считать просмотры (0 — за всё время) и как часто пересчитывать
+POPULAR_ITEMS_COUNT = 4
+POPULAR_WINDOW_DAYS = 7
+POPULAR_REFRESH_SECONDS = 60
+
+# Фасеты каталога (артисты/жанры/годы) и статистика цен без фильтров: сколько секунд
+# держать в памяти процесса
+FACET_CACHE_TTL = 300
+
+# Сколько результатов каждого типа показывать на странице поиска
+SEARCH_RESULTS_LIMIT = 20
+
+# Статей на странице /posts и в Atom-ленте /posts/feed.xml
+POSTS_PER_PAGE = 10
+FEED_SIZE = 20
+
+# JSON API (/api/v1/...): размер страницы по умолчанию и максимальный (?limit=)
+API_PAGE_SIZE = 40
+API_MAX_PAGE_SIZE = 100
+
+# Кеш готовых страниц для гостей: время жизни (сек), число страниц и общий размер
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_TTL = 60
+RESPONSE_CACHE_MAX_ENTRIES = 1000
+RESPONSE_CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+# Хеширование паролей (см. passwords.py): метод в формате werkzeug, например
+# "scrypt", "scrypt:32768:8:1" или "pbkdf2:sha256:600000". Старые хеши
+# пересчитываются при входе. Потоков хеширования на процесс и размер очереди
+PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt")
+PASSWORD_HASH_WORKERS = 2
+PASSWORD_HASH_QUEUE = 16
+# Попыток входа: (сколько, за сколько секунд) с одного IP и неудачных — на одно имя
+LOGIN_RATE_LIMIT_IP = (20, 60)
+LOGIN_RATE_LIMIT_USER = (5, 300)
+# Сколько обратных прокси (nginx и т.п.) стоит перед приложением. Адрес клиента
+# (для лимита по IP) тогда берётся из X-Forwarded-For, добавленного ими, а не из
+# адреса соединения — иначе все клиенты делят один лимит адреса nginx.
+# 0 — прокси нет: заголовок подделывается клиентом, ему не верим
+TRUSTED_PROXIES = int(os.environ.get("TRUSTED_PROXIES", 0))
+
+# Сколько секунд держать в памяти снимок вошедшего пользователя (id, имя, роль)
+USER_CACHE_TTL = 60
+
+# Данные страницы товара (товар, картинки, похожие товары) в памяти процесса:
+# сколько товаров держать и сколько секунд. Сама страница для гостей — в кеше страниц
+ITEM_DETAIL_CACHE_SIZE = 5000
+ITEM_DETAIL_CACHE_TTL = 300
+
+# События об изменении товаров для SSE (см. events.py): как часто процесс читает
+# новые события и сколько секунд они хранятся в item_event. Подписок на процесс
+# не больше EVENTS_MAX_SUBSCRIBERS — в воркере gthread каждая занимает поток,
+# в воркере gevent можно тысячи. Поэтому роуты SSE работают только при
+# EVENTS_ENABLED=1 (сервис событий на gevent, см. docker-compose.yml), а страница
+# товара подписывается на события, только если задан EVENTS_URL — адрес этого
+# сервиса (например, "http://localhost:8001")
+EVENTS_ENABLED = os.environ.get("EVENTS_ENABLED") == "1"
+EVENTS_POLL_INTERVAL = 1.0
+EVENTS_RETENTION = 600
+EVENTS_MAX_SUBSCRIBERS = int(os.environ.get("EVENTS_MAX_SUBSCRIBERS", 2))
+EVENTS_URL = os.environ.get("EVENTS_URL", "")
+# Склейка правок (сек), ping, время жизни одного потока до переподключения
+EVENTS_COALESCE = 0.5
+EVENTS_HEARTBEAT = 15
+EVENTS_STREAM_LIFETIME = 300
+
+# Статика со ссылками через static_url() (версия = хеш файла) и картинки товаров
+# (имя = хеш содержимого) не меняются по одному адресу — браузер хранит их год
+STATIC_MAX_AGE = 365 * 24 * 3600
+# Скомпилированные шаблоны Jinja на диске: новые воркеры не компилируют их заново.
+# TEMPLATE_WARMUP — скомпилировать все шаблоны при старте, а не на первом запросе
+TEMPLATE_CACHE_DIR = None  # None — instance/jinja-cache
+TEMPLATE_WARMUP = True
+
+# Пагинация каталога: "keyset" (курсор в URL) или "offset" (?page=N)
+CATALOG_PAGINATION = "keyset"
+
+# Профилирование запросов (см. metrics.py): METRICS_ENABLED=1 в окружении.
+# Заголовок Server-Timing, /metrics для Prometheus и предупреждения о N+1 в логе
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED") == "1"
+N_PLUS_ONE_THRESHOLD = 5
@@ -0,0 +1,39 @@
+# ====== Номера версий данных (ETag API) ======
+#
+# Номера тегов кеша страниц (response_cache.py) живут в памяти процесса:
+# воркеры gunicorn не видят изменений друг друга. ETag ответов API поэтому
+# считается из таблицы data_version — строка на каждый вид данных:
+#
+#     items    — товары, их картинки и похожие товары (items_changed(),
+#                item_pages_changed() в catalog.py);
+#     articles — статьи (articles_changed() в blog.py);
+#     views    — просмотры (flush_views() в catalog.py, в той же транзакции).
+#
+# Таблица одна на все воркеры, поэтому одинаковые данные дают одинаковый
+# ETag в любом воркере, а ETag меняется только вместе с данными.
+#
+# items и articles увеличиваются отдельной транзакцией ПОСЛЕ коммита
+# изменения: клиент мог успеть получить новые данные со старым номером —
+# тогда следующая проверка отдаст 200 вместо 304. Наоборот (новый номер при
+# старых данных) не бывает, в том числе на отстающей реплике.
+
+from sqlalchemy import select, update
+
+NAMES = ("items", "articles", "views")
+
+
+def bump(connection, table, *names):
+    # UPDATE data_version SET version = version + 1 WHERE name IN (...)
+    connection.execute(update(table).where(table.c.name.in_(names)).values(version=table.c.version + 1))
+
+
+def current(connection, table, *names):
+    # "items=12,views=340" — часть ETag; один запрос по первичному ключу
+    rows = connection.execute(select(table.c.name, table.c.version).where(table.c.name.in_(names))
+                              .order_by(table.c.name))
+    return ",".join("%s=%d" % (name, version) for name, version in rows)
+
+
+def seed(connection, table):
+    # Начальные строки: миграция и db.create_all() (новая база, тесты)
+    connection.execute(table.insert(), [{"name": name, "version": 0} for name in NAMES])
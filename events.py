@@ -0,0 +1,267 @@
+# ====== События об изменении товаров (Server-Sent Events) ======
+#
+# Покупатели держат открытой страницу товара и ждут, когда он появится в
+# продаже или подешевеет, — и обновляют её раз за разом. Теперь страница
+# подписывается на /cat/<id>/events (каталог и внешние клиенты — на
+# /events/items?item=..&artist=..&genre=..) и получает изменения по одному
+# долгому соединению, которое в простое ничего не стоит базе.
+#
+# Откуда события. Создание, удаление и изменение цены, названия или наличия
+# товара через ORM пишут строку в item_event в той же транзакции, что и сам
+# товар (события модели Item в models.py): откат — нет события. Воркеров
+# gunicorn несколько, админ правит товар в одном из них, а покупатель
+# подключён к другому, поэтому шина в памяти процесса читает события из
+# таблицы: один фоновый поток на процесс раз в interval секунд выбирает
+# строки с id больше последнего прочитанного и раздаёт их подписчикам
+# этого процесса. Один запрос в секунду на процесс при любом числе
+# подключений и ни одного, пока подписчиков нет.
+#
+# Склейка. Подписка хранит только последнее событие по каждому товару:
+# серия правок (цена, потом наличие, потом снова цена) уходит клиенту одним
+# событием с итоговым состоянием. Поток SSE после пробуждения ещё coalesce
+# секунд ждёт остальные правки той же пачки.
+#
+# Пропуски. id события уходит клиенту полем "id:", браузер при
+# переподключении присылает Last-Event-ID, и подписка досылает пропущенное
+# из item_event (строки хранятся retention секунд). В PostgreSQL транзакция
+# с меньшим id может закоммититься позже — такие дыры в id перечитываются
+# ещё GAP_TIMEOUT секунд.
+#
+# Соединения. В воркере gthread каждое SSE-соединение занимает поток,
+# поэтому их число на процесс ограничено (max_subscribers, сверх — 503).
+# Тысячи простаивающих соединений держит отдельный сервис с воркером
+# gevent (WEB_WORKER_CLASS=gevent, см. gunicorn.conf.py и docker-compose.yml):
+# под ним потоки и Event этого модуля — гринлеты, а события он читает из той
+# же таблицы.
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, or_, select
+
+logger = logging.getLogger(__name__)
+
+# Поля товара, которые попадают в событие (и по которым работают фильтры)
+FIELDS = ("title", "price", "isActive", "artist", "genre")
+# Сколько событий читать за один опрос; остальные — на следующем
+BATCH = 1000
+# Сколько секунд ждать строки с пропущенными id (незакоммиченные транзакции)
+GAP_TIMEOUT = 10.0
+# Дыры больше этого — не транзакции в полёте, а скачок последовательности
+MAX_GAP = 100
+PURGE_INTERVAL = 60
+
+
+class EventBusFull(Exception):
+    pass
+
+
+def record(connection, event_table, kind, item):
+    # kind — "created", "updated" или "deleted". Вызывается из событий модели
+    # на соединении flush: строка закоммитится или откатится вместе с товаром
+    values = {name: getattr(item, name) for name in FIELDS}
+    if values["isActive"] is None:
+        values["isActive"] = True  # default колонки
+    connection.execute(insert(event_table).values(item_id=item.id, kind=kind,
+                                                  created_at=datetime.utcnow(), **values))
+
+
+def fetch(session, event_table, after_id, ids=(), limit=BATCH):
+    # События с id > after_id (и с id из ids — дыры прошлых опросов) по возрастанию id
+    condition = event_table.c.id > after_id
+    if ids:
+        condition = or_(condition, event_table.c.id.in_(list(ids)))
+    rows = session.execute(select(event_table).where(condition).order_by(event_table.c.id).limit(limit))
+    return [dict(row._mapping) for row in rows]
+
+
+def latest_id(session, event_table):
+    return session.execute(select(func.max(event_table.c.id))).scalar() or 0
+
+
+def purge(session, event_table, retention):
+    cutoff = datetime.utcnow() - timedelta(seconds=retention)
+    session.execute(delete(event_table).where(event_table.c.created_at < cutoff))
+    session.commit()
+
+
+def payload(event):
+    # То, что видит клиент: id товара, что произошло и его новое состояние
+    data = {"id": event["item_id"], "event": event["kind"]}
+    data.update((name, event[name]) for name in FIELDS)
+    return data
+
+
+def format_event(event):
+    data = json.dumps(payload(event), ensure_ascii=False, separators=(",", ":"))
+    return "id: %d\nevent: item\ndata: %s\n\n" % (event["id"], data)
+
+
+class Subscription:
+    # Подписка на товары items, исполнителей artists и жанры genres
+    # (любое совпадение); без фильтров — на все товары
+
+    def __init__(self, items=(), artists=(), genres=()):
+        self.items = set(items)
+        self.artists = set(artists)
+        self.genres = set(genres)
+        self._pending = OrderedDict()  # item_id -> последнее событие
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+    def matches(self, event):
+        if not (self.items or self.artists or self.genres):
+            return True
+        return (event["item_id"] in self.items or event["artist"] in self.artists
+                or event["genre"] in self.genres)
+
+    def push(self, event):
+        with self._lock:
+            current = self._pending.pop(event["item_id"], None)
+            if current is not None and current["id"] > event["id"]:
+                event = current  # досылка по Last-Event-ID не затирает более свежее
+            self._pending[event["item_id"]] = event
+        self._ready.set()
+
+    def wait(self, timeout):
+        return self._ready.wait(timeout)
+
+    def drain(self):
+        # Накопленные события по возрастанию id, по одному на товар
+        with self._lock:
+            events = list(self._pending.values())
+            self._pending.clear()
+            self._ready.clear()
+        return events
+
+
+class EventBus:
+
+    def __init__(self, fetch, latest, purge=None, interval=1.0, retention=600, max_subscribers=100):
+        # fetch(after_id, ids) -> события; latest() -> последний id;
+        # purge(retention) удаляет старые строки
+        self._fetch = fetch
+        self._latest = latest
+        self._purge = purge
+        self.interval = interval
+        self.retention = retention
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._last_id = None  # None — подписчиков не было, позиция неизвестна
+        self._gaps = {}  # пропущенный id -> до какого момента его ждать
+        self._purged_at = 0.0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def subscribe(self, subscription, last_event_id=None):
+        self._ensure_started()
+        if self._last_id is None:
+            latest = self._latest()
+            with self._lock:
+                if self._last_id is None:
+                    self._last_id = latest
+                    self._gaps = {}
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise EventBusFull()
+            self._subscribers.add(subscription)
+            # Всё после start раздаст фоновый поток, до start — досылаем сами
+            start = self._last_id
+        if last_event_id is not None and last_event_id < start:
+            try:
+                for event in self._fetch(last_event_id, ()):
+                    if event["id"] <= start and subscription.matches(event):
+                        subscription.push(event)
+            except Exception:
+                self.unsubscribe(subscription)
+                raise
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscribers(self):
+        return len(self._subscribers)
+
+    def poll(self):
+        now = time.monotonic()
+        if self._purge is not None and now - self._purged_at > PURGE_INTERVAL:
+            self._purged_at = now
+            self._purge(self.retention)
+        with self._lock:
+            if not self._subscribers:
+                self._last_id = None  # некому раздавать — не читаем
+                return
+            after = self._last_id
+            if after is None:
+                return
+            gaps = list(self._gaps)
+        events = self._fetch(after, gaps)
+        with self._lock:
+            # Раздача под блокировкой: subscribe() видит либо позицию до пачки
+            # (и получит её как подписчик), либо после (и досылает сам)
+            expected = after + 1
+            for event in events:
+                event_id = event["id"]
+                if event_id > after:
+                    if event_id - expected <= MAX_GAP:
+                        for missing in range(expected, event_id):
+                            self._gaps[missing] = now + GAP_TIMEOUT
+                    expected = event_id + 1
+                    if self._last_id is not None:
+                        self._last_id = max(self._last_id, event_id)
+                else:
+                    self._gaps.pop(event_id, None)
+                for subscription in self._subscribers:
+                    if subscription.matches(event):
+                        subscription.push(event)
+            self._gaps = {event_id: until for event_id, until in self._gaps.items() if until > now}
+
+    def _ensure_started(self):
+        # Как у счётчика просмотров: поток запускается лениво и заново после fork()
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._subscribers = set()
+            self._last_id = None
+            self._thread = threading.Thread(target=self._run, name="item-events", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Ошибка при чтении событий товаров")
+
+
+def stream(subscription, heartbeat=15, coalesce=0.5, lifetime=300, retry=3000):
+    # Тело ответа text/event-stream. Комментарий ": ping" раз в heartbeat
+    # секунд не даёт прокси закрыть соединение и обнаруживает ушедших
+    # клиентов. Через lifetime секунд поток заканчивается, браузер
+    # переподключается (через retry мс) с Last-Event-ID — так соединения не
+    # переживают перезапуск воркера и max_requests
+    yield "retry: %d\n\n" % retry
+    deadline = time.monotonic() + lifetime
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        if not subscription.wait(min(heartbeat, remaining)):
+            yield ": ping\n\n"
+            continue
+        time.sleep(coalesce)
+        for event in subscription.drain():
+            yield format_event(event)
@@ -0,0 +1,42 @@
+# ====== Общие объекты приложения ======
+#
+# Создаются при импорте без приложения и привязываются к нему в init_app()
+# из create_app() (app.py) — так модели и блюпринты могут импортировать их
+# напрямую. Настройки (config.py) применяются тоже в init_app(): до первого
+# использования объекты ничего не запускают.
+
+from flask_login import LoginManager
+from flask_sqlalchemy import SQLAlchemy
+
+from database import RoutingSession, configure_sqlite
+from images import ImageStore
+from metrics import RequestMetrics
+from passwords import PasswordHasher
+from response_cache import ResponseCache
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})  # создаём объект базы данных
+login_manager = LoginManager()
+response_cache = ResponseCache()
+request_metrics = RequestMetrics()
+password_hasher = PasswordHasher()
+# Картинки товаров: имя файла = sha256 содержимого, уменьшенные копии — в фоне
+image_store = ImageStore("static/images")
+
+
+def init_app(app):
+    db.init_app(app)
+    with app.app_context():
+        request_metrics.init_app(app, db.engine)
+        for engine in db.engines.values():
+            configure_sqlite(engine, app.config["SQLITE_PRAGMAS"])  # WAL, busy_timeout и т.д.
+            if engine is not db.engine:
+                request_metrics.watch(engine)
+    response_cache.init_app(app)
+    login_manager.init_app(app)
+    login_manager.login_view = "auth.login"
+
+    password_hasher.method = app.config['PASSWORD_HASH_METHOD']
+    password_hasher.workers = app.config['PASSWORD_HASH_WORKERS']
+    password_hasher.queue_limit = app.config['PASSWORD_HASH_QUEUE']
+    image_store.folder = app.config['UPLOAD_FOLDER']
+    image_store.workers = app.config['IMAGE_WORKERS']
@@ -0,0 +1,112 @@
+# ====== Фасеты каталога (артист / жанр / год) ======
+#
+# Вместо трёх отдельных SELECT DISTINCT по таблице item делаем один
+# сгруппированный запрос:
+#
+#     SELECT artist, genre, release_year, COUNT(*) FROM item
+#     WHERE <фильтры активности и цены> GROUP BY artist, genre, release_year
+#
+# и уже в Python раскладываем его на три списка значений со счётчиками.
+# Строк в ответе столько, сколько разных сочетаний (артист, жанр, год),
+# а не товаров, поэтому это дёшево.
+#
+# Результат без фильтров кешируется в памяти процесса и сбрасывается
+# роутами, которые меняют товары (create_item, item_update, item_delete).
+
+import threading
+import time
+from collections import Counter
+
+
+class FacetCache:
+    # Кеш сгруппированных строк для каталога без фильтров.
+    # ttl — страховка на случай нескольких процессов: другой воркер
+    # не узнает об инвалидации, поэтому данные всё равно устаревают.
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._rows = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, loader):
+        # loader() — функция, которая выполняет сгруппированный запрос
+        with self._lock:
+            expired = self.ttl is not None and time.monotonic() - self._loaded_at > self.ttl
+            if self._rows is None or expired:
+                self._rows = list(loader())
+                self._loaded_at = time.monotonic()
+            return self._rows
+
+    def invalidate(self):
+        with self._lock:
+            self._rows = None
+
+
+# Больше любого года выпуска; длиннее — не год, а мусор (и переполнение INTEGER)
+YEAR_LIMIT = 9999
+
+
+def parse_year(value):
+    # Строка из URL -> год (int) или None, если это не год
+    try:
+        year = int(value)
+    except ValueError:
+        return None
+    return year if 0 <= year <= YEAR_LIMIT else None
+
+
+def parse_years(values):
+    # Выбранные годы из ?year=...; мусор игнорируется, как и негодная цена
+    return [year for year in map(parse_year, values) if year is not None]
+
+
+def _selected(values, selected):
+    # Пустой выбор означает "фильтр не задан" — подходит любое значение
+    return not selected or values in selected
+
+
+def build_facets(rows, artists_selected=(), genres_selected=(), years_selected=()):
+    # rows — кортежи (artist, genre, release_year, count).
+    # Счётчик значения фасета считается с учётом выбора в ДРУГИХ фасетах:
+    # если выбран артист, в списке артистов всё равно видно, сколько
+    # товаров у соседних, а в жанрах и годах — только по выбранному артисту.
+    artists_selected = set(artists_selected)
+    genres_selected = set(genres_selected)
+    years_selected = set(years_selected)
+
+    artists, genres, years = Counter(), Counter(), Counter()
+    for artist, genre, year, count in rows:
+        by_artist = _selected(artist, artists_selected)
+        by_genre = _selected(genre, genres_selected)
+        by_year = _selected(year, years_selected)
+        if by_genre and by_year:
+            artists[artist] += count
+        if by_artist and by_year:
+            genres[genre] += count
+        if by_artist and by_genre:
+            years[year] += count
+
+    return {"artist": artists, "genre": genres, "year": years}
+
+
+def facet_options(base_rows):
+    # Полные списки значений для выпадающих меню (как раньше: артисты и
+    # жанры по алфавиту, годы по убыванию, пустые значения пропускаем)
+    artists = sorted({r[0] for r in base_rows if r[0]})
+    genres = sorted({r[1] for r in base_rows if r[1]})
+    years = sorted({r[2] for r in base_rows if r[2]}, reverse=True)
+    return {"artist": artists, "genre": genres, "year": years}
+
+
+def with_counts(options, counts):
+    # Склеиваем список значений со счётчиками: [(значение, количество), ...]
+    return [(value, counts.get(value, 0)) for value in options]
+
+
+def facet_total(counts, artists_selected=()):
+    # Сколько товаров подходит под все фильтры. Счётчики артистов уже учитывают
+    # выбор жанров и годов, остаётся сложить выбранных артистов (или всех)
+    if artists_selected:
+        return sum(counts["artist"].get(a, 0) for a in set(artists_selected))
+    return sum(counts["artist"].values())
@@ -0,0 +1,35 @@
+# ====== Настройки gunicorn ======
+# Все значения можно переопределить переменными окружения.
+
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+
+# Процессы x потоки. Большая часть времени запроса — ожидание SQLite и
+# рендер шаблона, поэтому потоки (gthread) дешевле лишних процессов.
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("WEB_THREADS", 4))
+worker_class = os.environ.get("WEB_WORKER_CLASS", "gthread")
+
+# Сервис событий (SSE, см. events.py) запускается отдельно с WEB_WORKER_CLASS=gevent:
+# там соединение — гринлет, а не поток, и воркер держит тысячи простаивающих
+# подписчиков. Обычные страницы остаются на gthread — под gevent запрос к
+# базе блокировал бы весь воркер
+worker_connections = int(os.environ.get("WEB_CONNECTIONS", 1000))
+
+# Приложение создаётся (create_app) в каждом воркере отдельно: у каждого свой пул
+# соединений с базой и свои фоновые потоки (счётчик просмотров и т.п.),
+# ничего не наследуется через fork().
+preload_app = False
+
+# Воркер перезапускается после N запросов — страховка от утечек памяти
+max_requests = int(os.environ.get("MAX_REQUESTS", 2000))
+max_requests_jitter = 200
+
+timeout = int(os.environ.get("WEB_TIMEOUT", 30))
+graceful_timeout = 30  # успеть сбросить буфер просмотров при остановке
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
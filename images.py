@@ -0,0 +1,258 @@
+# ====== Хранилище изображений товаров ======
+#
+# Загруженный файл сохраняется под именем, равным sha256 его содержимого:
+#
+#     static/images/3f/3fa4...c1.jpg
+#
+# Поэтому два товара с "cover.jpg" больше не затирают друг друга, а одна и
+# та же картинка, загруженная дважды, хранится в одном экземпляре.
+#
+# Для каждой картинки в фоне (пул потоков, не в запросе) делаются
+# уменьшенные копии — thumb (для карточек) и medium — в исходном формате
+# и в WebP:
+#
+#     3f/3fa4...c1.thumb.jpg   3f/3fa4...c1.thumb.webp
+#     3f/3fa4...c1.medium.jpg  3f/3fa4...c1.medium.webp
+#
+# Пока копии не готовы (или Pillow не установлен), шаблоны показывают оригинал.
+#
+# Загрузка идёт в два шага: stage() пишет файл кусками во временную папку
+# .staging (память воркера не растёт с размером файла) и сразу знает итоговое
+# имя по хешу; publish() переносит файл на место уже после COMMIT в базе.
+# Если транзакция не удалась — discard() просто удаляет временные файлы.
+#
+# reconcile() находит файлы хранилища, на которые не ссылается ни одна
+# строка ItemImage (например, после падения процесса между COMMIT и
+# удалением файла), и брошенные временные файлы, и удаляет их.
+
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Ширина уменьшенных копий в пикселях
+VARIANTS = {"thumb": 320, "medium": 800}
+
+CHUNK_SIZE = 64 * 1024
+
+_EXTENSIONS = {"jpg", "jpeg", "png", "gif", "webp"}
+
+STAGING = ".staging"
+
+# Файлы, которыми управляет хранилище: "ab/<sha256>.jpg", "ab/<sha256>.thumb.webp".
+# Всё остальное в папке (placeholder.jpg, старые картинки) reconcile() не трогает.
+_STORED = re.compile(r"^[0-9a-f]{2}/([0-9a-f]{64})\.(?:[a-z]+\.)?[a-z]+$")
+
+_pillow = None
+
+
+def _image_module():
+    # Pillow импортируется при первой загрузке картинки, а не при старте
+    # воркера; None — Pillow не установлен, уменьшенных копий просто не будет
+    global _pillow
+    if _pillow is None:
+        try:
+            from PIL import Image
+        except ImportError:
+            Image = False
+        _pillow = Image
+    return _pillow or None
+
+
+def _extension(filename):
+    ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    if ext == "jpeg":
+        ext = "jpg"
+    return ext if ext in _EXTENSIONS else "jpg"
+
+
+def variant_name(filename, variant, ext=None):
+    # "3f/3fa4...c1.jpg" -> "3f/3fa4...c1.thumb.webp"
+    base, _, original_ext = filename.rpartition(".")
+    return "%s.%s.%s" % (base, variant, ext or original_ext)
+
+
+def is_stored(filename):
+    # Файл хранилища (оригинал или копия) — его содержимое по этому имени не меняется
+    return _STORED.match(filename) is not None
+
+
+def all_files(filename):
+    # Оригинал и все его уменьшенные копии (для удаления)
+    names = [filename]
+    for variant in VARIANTS:
+        names.append(variant_name(filename, variant))
+        names.append(variant_name(filename, variant, "webp"))
+    return names
+
+
+class ImageStore:
+
+    def __init__(self, folder, workers=2):
+        self.folder = folder
+        self.workers = workers
+        self._executor = None
+
+    def path(self, filename):
+        return os.path.join(self.folder, filename)
+
+    def stage(self, file):
+        # file — werkzeug FileStorage. Читаем поток кусками, считая sha256,
+        # во временный файл. Возвращает (имя файла в хранилище, временный путь).
+        staging = self.path(STAGING)
+        os.makedirs(staging, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=staging, prefix="upload-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                while True:
+                    chunk = file.stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    tmp.write(chunk)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        name = digest.hexdigest()
+        return "%s/%s.%s" % (name[:2], name, _extension(file.filename or "")), tmp_path
+
+    def publish(self, staged):
+        # После успешного COMMIT: переносим файлы на место (rename в пределах
+        # одной файловой системы атомарен) и ставим в очередь уменьшенные копии
+        for filename, tmp_path in staged:
+            target = self.path(filename)
+            if os.path.exists(target):
+                os.remove(tmp_path)  # такая картинка уже есть
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(tmp_path, target)
+            self.schedule_variants(filename)
+
+    def discard(self, staged):
+        for _, tmp_path in staged:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def schedule_variants(self, filename):
+        if _image_module() is None:
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="images")
+        self._executor.submit(self._make_variants, filename)
+
+    def _make_variants(self, filename):
+        try:
+            with _image_module().open(self.path(filename)) as original:
+                original.load()
+                for variant, width in VARIANTS.items():
+                    image = original.copy()
+                    image.thumbnail((width, width * 4))
+                    self._write(image, variant_name(filename, variant), original.format)
+                    self._write(image, variant_name(filename, variant, "webp"), "WEBP")
+        except Exception:
+            logger.exception("Не удалось сделать уменьшенные копии %s", filename)
+
+    def _write(self, image, filename, fmt):
+        # Сначала во временный файл — чтобы шаблон не увидел недописанную картинку
+        target = self.path(filename)
+        tmp_path = target + ".tmp"
+        if fmt == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.save(tmp_path, format=fmt, quality=82, optimize=True)
+        os.replace(tmp_path, target)
+
+    def remove(self, filename):
+        for name in all_files(filename):
+            path = self.path(name)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def sources(self, filename, url):
+        # Для шаблона: src и srcset по готовым уменьшенным копиям;
+        # url(имя) превращает имя файла в адрес. Старые картинки (до хранилища
+        # по хешу) и ещё не обработанные отдаются как есть.
+        ready = [(variant, width) for variant, width in VARIANTS.items()
+                 if os.path.exists(self.path(variant_name(filename, variant, "webp")))]
+        if not ready:
+            return {"src": url(filename), "srcset": "", "webp_srcset": ""}
+        return {
+            "src": url(variant_name(filename, ready[0][0])),
+            "srcset": ", ".join("%s %dw" % (url(variant_name(filename, v)), w) for v, w in ready),
+            "webp_srcset": ", ".join("%s %dw" % (url(variant_name(filename, v, "webp")), w) for v, w in ready),
+        }
+
+    def reconcile(self, referenced, grace=3600, dry_run=False):
+        # referenced — имена файлов из ItemImage. Удаляет файлы хранилища
+        # (с копиями), чьи хеши нигде не используются, и временные файлы
+        # старше grace секунд. Возвращает список удалённых (или найденных) файлов.
+        hashes = set()
+        for filename in referenced:
+            match = _STORED.match(filename)
+            if match:
+                hashes.add(match.group(1))
+
+        removed = []
+        deadline = time.time() - grace
+        for root, _, files in os.walk(self.folder):
+            for name in files:
+                path = os.path.join(root, name)
+                relative = os.path.relpath(path, self.folder).replace(os.sep, "/")
+                if relative.startswith(STAGING + "/") or relative.endswith(".tmp"):
+                    orphan = True
+                else:
+                    match = _STORED.match(relative)
+                    orphan = match is not None and match.group(1) not in hashes
+                if not orphan:
+                    continue
+                try:
+                    if os.path.getmtime(path) > deadline:
+                        continue  # файл мог только что появиться — не трогаем
+                    if not dry_run:
+                        os.remove(path)
+                except FileNotFoundError:
+                    continue
+                removed.append(relative)
+        return removed
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+
+class Reconciler:
+    # Фоновый поток, который раз в interval секунд вызывает job().
+    # Как и счётчик просмотров, запускается лениво и заново после fork().
+
+    def __init__(self, job, interval=3600):
+        self.job = job
+        self.interval = interval
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        if not self.interval:
+            return
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="images-reconcile", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.job()
+            except Exception:
+                logger.exception("Ошибка при очистке неиспользуемых картинок")
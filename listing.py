@@ -0,0 +1,79 @@
+# ====== Витрина каталога (узкая копия товаров для списков) ======
+#
+# Строка item вместе с описанием (text) бывает в десятки раз больше того,
+# что нужно спискам: каталогу, главной, фасетам и API. При сканировании
+# индекса и выборке строк SQLite тащит через кеш страниц целые строки item.
+# Таблица item_listing хранит только поля карточки и фильтров:
+#
+#     id, title, price, isActive, artist, genre, release_year, views,
+#     created_at, cover_image
+#
+# и те же индексы, что у item. Она поддерживается в той же транзакции, что
+# и изменение товара:
+#
+#   - ORM (создание/изменение/удаление в роутах) — события модели Item в
+#     models.py вызывают refresh()/remove() на соединении flush;
+#   - массовые записи в обход ORM (импорт каталога, запись просмотров)
+#     обновляют витрину сами — refresh() по id или тот же UPDATE.
+#
+# `flask listing rebuild` пересобирает таблицу целиком, `flask listing check`
+# сравнивает её с item и завершается с ошибкой, если есть расхождения.
+
+from sqlalchemy import delete, except_, func, insert, or_, select
+
+COLUMNS = ("id", "title", "price", "isActive", "artist", "genre", "release_year",
+           "views", "created_at", "cover_image")
+
+
+def _source(item_table):
+    return select(*[item_table.c[name] for name in COLUMNS])
+
+
+def _copy(connection, item_table, listing_table, condition=None):
+    # INSERT INTO item_listing (...) SELECT ... FROM item [WHERE ...]
+    source = _source(item_table)
+    if condition is not None:
+        source = source.where(condition)
+    connection.execute(insert(listing_table).from_select(list(COLUMNS), source))
+
+
+def _by_id(table, ids, after_id):
+    conditions = []
+    if ids:
+        conditions.append(table.c.id.in_(ids))
+    if after_id is not None:
+        conditions.append(table.c.id > after_id)
+    return or_(*conditions) if conditions else None
+
+
+def refresh(connection, item_table, listing_table, ids=(), after_id=None):
+    # Перечитывает из item строки ids (и все с id > after_id — новые товары
+    # после массовой вставки). Удалённые товары просто исчезают из витрины.
+    ids = list(ids)
+    if not ids and after_id is None:
+        return
+    connection.execute(delete(listing_table).where(_by_id(listing_table, ids, after_id)))
+    _copy(connection, item_table, listing_table, _by_id(item_table, ids, after_id))
+
+
+def remove(connection, listing_table, ids):
+    connection.execute(delete(listing_table).where(listing_table.c.id.in_(list(ids))))
+
+
+def rebuild(session, item_table, listing_table):
+    # Полная пересборка одной транзакцией: читатели до COMMIT видят старую витрину
+    session.execute(delete(listing_table))
+    _copy(session, item_table, listing_table)
+    session.commit()
+    return session.execute(select(func.count()).select_from(listing_table)).scalar()
+
+
+def check(session, item_table, listing_table, limit=20):
+    # Расхождения витрины с item: (нет или устарели в витрине, лишние в витрине),
+    # не больше limit id в каждом списке
+    listing = select(*[listing_table.c[name] for name in COLUMNS])
+    item_ids = {row[0] for row in session.execute(except_(_source(item_table), listing).limit(limit))}
+    listing_ids = {row[0] for row in session.execute(except_(listing, _source(item_table)).limit(limit))}
+    stale = sorted(item_ids)
+    extra = sorted(listing_ids - item_ids)
+    return stale, extra
@@ -0,0 +1,187 @@
+# ====== Метрики запросов (профилирование) ======
+#
+# Включается настройкой METRICS_ENABLED. Для каждого запроса считается:
+#
+#   - общее время обработки — гистограмма по endpoint'ам;
+#   - число SQL-запросов и время в базе (события SQLAlchemy
+#     before_cursor_execute / after_cursor_execute);
+#   - время рендера шаблонов (сигналы Flask before_render_template /
+#     template_rendered);
+#   - подозрение на N+1: один и тот же SQL (с разными параметрами)
+#     выполнен в запросе N_PLUS_ONE_THRESHOLD раз и больше — например,
+#     ленивая подгрузка item.images для каждой карточки.
+#
+# Результат отдаётся заголовком Server-Timing (видно во вкладке Network
+# браузера) и в текстовом формате Prometheus на /metrics (только для админа).
+# Счётчики живут в памяти процесса: у каждого воркера gunicorn свои.
+
+import logging
+import threading
+import time
+from collections import Counter
+
+from flask import before_render_template, g, has_app_context, request, template_rendered
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограммы времени ответа, в секундах
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+PREFIX = "blackneedle"
+
+
+class Histogram:
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # последняя — +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        # Для Prometheus корзины накопительные: le="0.1" включает всё, что <= 0.1
+        total = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            total += count
+            yield bound, total
+
+
+class _RequestStats:
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.statements = Counter()
+        self._query_started = None
+        self._template_started = None
+
+
+class RequestMetrics:
+
+    def __init__(self, app=None, engine=None):
+        self.latency = {}  # endpoint -> Histogram
+        self.queries = Counter()  # endpoint -> число SQL-запросов
+        self.db_seconds = Counter()
+        self.template_seconds = Counter()
+        self.n_plus_one = Counter()
+        self._lock = threading.Lock()
+        self.app = app
+        if app is not None:
+            self.init_app(app, engine)
+
+    def init_app(self, app, engine):
+        app.config.setdefault("METRICS_ENABLED", False)
+        app.config.setdefault("METRICS_SERVER_TIMING", True)
+        app.config.setdefault("N_PLUS_ONE_THRESHOLD", 5)
+        self.app = app
+        if not app.config["METRICS_ENABLED"]:
+            return
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        self.watch(engine)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+
+    def watch(self, engine):
+        # Считать запросы ещё одного движка (например, реплики)
+        if not self.app.config["METRICS_ENABLED"]:
+            return
+        event.listen(engine, "before_cursor_execute", self._before_cursor)
+        event.listen(engine, "after_cursor_execute", self._after_cursor)
+
+    def _stats(self):
+        # В фоновых потоках (запись просмотров и т.п.) статистики запроса нет
+        return g.get("_request_stats") if has_app_context() else None
+
+    def _start(self):
+        g._request_stats = _RequestStats()
+
+    def _before_cursor(self, conn, cursor, statement, parameters, context, executemany):
+        stats = self._stats()
+        if stats is not None:
+            stats._query_started = time.perf_counter()
+
+    def _after_cursor(self, conn, cursor, statement, parameters, context, executemany):
+        stats = self._stats()
+        if stats is None or stats._query_started is None:
+            return
+        stats.db_time += time.perf_counter() - stats._query_started
+        stats._query_started = None
+        stats.queries += 1
+        stats.statements[statement] += 1
+
+    def _before_render(self, sender, template, context, **extra):
+        stats = self._stats()
+        if stats is not None:
+            stats._template_started = time.perf_counter()
+
+    def _after_render(self, sender, template, context, **extra):
+        stats = self._stats()
+        if stats is not None and stats._template_started is not None:
+            stats.template_time += time.perf_counter() - stats._template_started
+            stats._template_started = None
+
+    def _finish(self, response):
+        stats = self._stats()
+        if stats is None:
+            return response
+        endpoint = request.endpoint or "unknown"
+        elapsed = time.perf_counter() - stats.started
+        repeated = [(sql, n) for sql, n in stats.statements.items()
+                    if n >= self.app.config["N_PLUS_ONE_THRESHOLD"]]
+        for sql, n in repeated:
+            logger.warning("Возможный N+1 в %s: %d раз %s", endpoint, n, " ".join(sql.split())[:200])
+
+        with self._lock:
+            self.latency.setdefault(endpoint, Histogram()).observe(elapsed)
+            self.queries[endpoint] += stats.queries
+            self.db_seconds[endpoint] += stats.db_time
+            self.template_seconds[endpoint] += stats.template_time
+            if repeated:
+                self.n_plus_one[endpoint] += 1
+
+        if self.app.config["METRICS_SERVER_TIMING"]:
+            response.headers.add("Server-Timing", 'db;dur=%.1f;desc="%d queries"' % (stats.db_time * 1000, stats.queries))
+            response.headers.add("Server-Timing", "tpl;dur=%.1f" % (stats.template_time * 1000))
+            response.headers.add("Server-Timing", "total;dur=%.1f" % (elapsed * 1000))
+        return response
+
+    def render(self):
+        # Текстовый формат Prometheus (exposition format 0.0.4)
+        lines = []
+
+        def metric(name, kind, help_text):
+            lines.append("# HELP %s_%s %s" % (PREFIX, name, help_text))
+            lines.append("# TYPE %s_%s %s" % (PREFIX, name, kind))
+
+        with self._lock:
+            metric("request_duration_seconds", "histogram", "Request latency by endpoint")
+            for endpoint, histogram in sorted(self.latency.items()):
+                for bound, total in histogram.cumulative():
+                    lines.append('%s_request_duration_seconds_bucket{endpoint="%s",le="%s"} %d'
+                                 % (PREFIX, endpoint, bound, total))
+                lines.append('%s_request_duration_seconds_sum{endpoint="%s"} %.6f' % (PREFIX, endpoint, histogram.sum))
+                lines.append('%s_request_duration_seconds_count{endpoint="%s"} %d' % (PREFIX, endpoint, histogram.count))
+            for name, values, fmt, help_text in (
+                ("db_queries_total", self.queries, "%d", "SQL statements executed"),
+                ("db_seconds_total", self.db_seconds, "%.6f", "Time spent in the database"),
+                ("template_seconds_total", self.template_seconds, "%.6f", "Time spent rendering templates"),
+                ("n_plus_one_total", self.n_plus_one, "%d", "Requests with a repeated SQL statement"),
+            ):
+                metric(name, "counter", help_text)
+                for endpoint, value in sorted(values.items()):
+                    lines.append(('%s_%s{endpoint="%s"} ' + fmt) % (PREFIX, name, endpoint, value))
+        return "\n".join(lines) + "\n"
@@ -1,7 +1,7 @@
 """add created_at to item
 
 Revision ID: 240a31fee276
-Revises: 
+Revises: 0b7e3c9d5a12
 Create Date: 2026-01-08 01:09:08.902874
 
 """
@@ -11,7 +11,7 @@ import sqlalchemy as sa
 
 # revision identifiers, used by Alembic.
 revision = '240a31fee276'
-down_revision = None
+down_revision = '0b7e3c9d5a12'
 branch_labels = None
 depends_on = None
 
@@ -0,0 +1,30 @@
+"""add data_version
+
+Revision ID: 4d2f8b6c1e93
+Revises: 6a0a227e2ec6
+Create Date: 2026-10-16 18:05:12.417306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d2f8b6c1e93'
+down_revision = '6a0a227e2ec6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    data_version = op.create_table('data_version',
+    sa.Column('name', sa.String(length=20), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    # Те же строки, что data_version.seed() при db.create_all()
+    op.bulk_insert(data_version, [{'name': name, 'version': 0} for name in ('items', 'articles', 'views')])
+
+
+def downgrade():
+    op.drop_table('data_version')
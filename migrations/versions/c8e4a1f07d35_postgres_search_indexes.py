@@ -0,0 +1,42 @@
+"""postgres search indexes
+
+Revision ID: c8e4a1f07d35
+Revises: b5d8e2a61f94
+Create Date: 2026-10-16 22:19:52.903118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8e4a1f07d35'
+down_revision = 'b5d8e2a61f94'
+branch_labels = None
+depends_on = None
+
+
+# GIN-индексы полнотекстового поиска для PostgreSQL (в SQLite поиск — FTS5,
+# ревизия d5e0b8a2f741). Выражения — зафиксированная копия PG_*_DOCUMENT из search.py
+SEARCH_INDEXES = {
+    'ix_item_search': ('item', ['title', 'artist', 'genre', 'text']),
+    'ix_article_search': ('article', ['title', 'intro', 'text']),
+}
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for index, (table, fields) in SEARCH_INDEXES.items():
+        document = " || ".join(
+            f"setweight(to_tsvector('simple', coalesce({table}.{field}, '')), '{label}')"
+            for field, label in zip(fields, 'ABCD')
+        )
+        op.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {table} USING gin (({document}))")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for index in SEARCH_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {index}")
@@ -0,0 +1,61 @@
+"""add fts5 search
+
+Revision ID: d5e0b8a2f741
+Revises: c27a4f9b6d18
+Create Date: 2026-10-16 16:40:08.118390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5e0b8a2f741'
+down_revision = 'c27a4f9b6d18'
+branch_labels = None
+depends_on = None
+
+
+# Виртуальные таблицы FTS5 с внешним содержимым и триггеры синхронизации
+# (та же схема, что в search.py; здесь — зафиксированная копия)
+FTS_TABLES = {
+    'item_fts': ('item', ['title', 'artist', 'genre', 'text']),
+    'article_fts': ('article', ['title', 'intro', 'text']),
+}
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table, (source, fields) in FTS_TABLES.items():
+        columns = ', '.join(fields)
+        new = ', '.join('new.' + f for f in fields)
+        old = ', '.join('old.' + f for f in fields)
+        op.execute(
+            f"CREATE VIRTUAL TABLE {table} USING fts5({columns}, content='{source}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_ai AFTER INSERT ON {source} BEGIN "
+            f"INSERT INTO {table}(rowid, {columns}) VALUES (new.id, {new}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_ad AFTER DELETE ON {source} BEGIN "
+            f"INSERT INTO {table}({table}, rowid, {columns}) VALUES ('delete', old.id, {old}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_au AFTER UPDATE OF {columns} ON {source} BEGIN "
+            f"INSERT INTO {table}({table}, rowid, {columns}) VALUES ('delete', old.id, {old}); "
+            f"INSERT INTO {table}(rowid, {columns}) VALUES (new.id, {new}); END"
+        )
+        # Индексируем уже существующие строки
+        op.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table in FTS_TABLES:
+        for suffix in ('ai', 'ad', 'au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_{suffix}")
+        op.execute(f"DROP TABLE IF EXISTS {table}")
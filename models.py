@@ -0,0 +1,187 @@
+# ====== Модели (таблицы базы данных) ======
+#
+# Вместе с моделями — события, которые меняют только другие таблицы в той же
+# транзакции (витрина item_listing, журнал item_event). Кеши в памяти
+# сбрасывают блюпринты (catalog.py, auth.py).
+
+from datetime import datetime
+
+from flask_login import UserMixin
+
+from data_version import seed as seed_versions
+from events import record as record_event
+from extensions import db, password_hasher
+from listing import refresh as refresh_listing, remove as remove_listing
+
+
+class Article(db.Model):
+    # Таблица статей
+    id = db.Column(db.Integer, primary_key = True)  # уникальный ID
+    title = db.Column(db.String(100), nullable = False)  # заголовок
+    intro = db.Column(db.String(300), nullable = False)  # краткое описание
+    text = db.Column(db.Text, nullable = False)  # основной текст статьи
+    date = db.Column(db.DateTime, default = datetime.utcnow, index = True)  # дата создания (по умолчанию сейчас)
+    
+    def __repr__(self):
+        # как объект отображается в консоли для отладки
+        return "<Article %r>" % self.id
+  
+    
+class Item(db.Model):
+    # Таблица товаров
+    id = db.Column(db.Integer, primary_key = True)  # уникальный ID
+    title = db.Column(db.String(100), nullable = False)  # название товара
+    price = db.Column(db.Integer, nullable = False)  # цена товара
+    isActive = db.Column(db.Boolean, default = True)  # флаг активности товара
+    text = db.Column(db.Text, nullable = False)  # описание товара
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable = False)
+    images = db.relationship('ItemImage', backref='item', lazy=True, cascade="all, delete")
+    views = db.Column(db.Integer, default = 0, server_default = "0", nullable = False)
+    artist = db.Column(db.String(100), nullable = False)
+    genre = db.Column(db.String(50), nullable = False, index = True)
+    release_year = db.Column(db.Integer, nullable = False, index = True)
+    # Имя файла первой картинки — копия images[0].filename, чтобы карточкам
+    # в каталоге и на главной не нужно было подгружать все изображения
+    cover_image = db.Column(db.String(100), nullable = True)
+    
+    __table_args__ = (
+        # Сортировки каталога; id в конце — тот же ключ, что у курсорной пагинации
+        db.Index("ix_item_created_at_id", "created_at", "id"),
+        db.Index("ix_item_price_id", "price", "id"),
+        db.Index("ix_item_views_id", "views", "id"),
+        # Покрывающий индекс для сгруппированного запроса фасетов (и фильтра по артисту):
+        # GROUP BY artist, genre, release_year с фильтрами по isActive/price без чтения таблицы
+        db.Index("ix_item_facets", "artist", "genre", "release_year", "isActive", "price"),
+    )
+    
+    def __repr__(self):
+        return "<Item %r>" % self.id
+
+
+class ItemListing(db.Model):
+    # Узкая копия item для каталога, главной, фасетов и API — без text
+    # (см. listing.py). Заполняется только из item, напрямую не изменяется
+    id = db.Column(db.Integer, primary_key = True, autoincrement = False)
+    title = db.Column(db.String(100), nullable = False)
+    price = db.Column(db.Integer, nullable = False)
+    isActive = db.Column(db.Boolean)
+    artist = db.Column(db.String(100), nullable = False)
+    genre = db.Column(db.String(50), nullable = False, index = True)
+    release_year = db.Column(db.Integer, nullable = False, index = True)
+    views = db.Column(db.Integer, nullable = False)
+    created_at = db.Column(db.DateTime, nullable = False)
+    cover_image = db.Column(db.String(100), nullable = True)
+
+    __table_args__ = (
+        # Те же индексы, что у item
+        db.Index("ix_item_listing_created_at_id", "created_at", "id"),
+        db.Index("ix_item_listing_price_id", "price", "id"),
+        db.Index("ix_item_listing_views_id", "views", "id"),
+        db.Index("ix_item_listing_facets", "artist", "genre", "release_year", "isActive", "price"),
+    )
+
+
+@db.event.listens_for(Item, "after_insert")
+@db.event.listens_for(Item, "after_update")
+def item_listing_refresh(mapper, connection, target):
+    # Витрина меняется в той же транзакции, что и товар
+    refresh_listing(connection, Item.__table__, ItemListing.__table__, [target.id])
+
+
+@db.event.listens_for(Item, "after_delete")
+def item_listing_remove(mapper, connection, target):
+    remove_listing(connection, ItemListing.__table__, [target.id])
+   
+    
+class ItemImage(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    item_id = db.Column(db.Integer, db.ForeignKey("item.id"), nullable = False, index = True)
+    filename = db.Column(db.String(100), nullable=False, index = True)
+
+
+class ItemRelated(db.Model):
+    # Готовые списки похожих товаров для страницы товара (см. related.py)
+    item_id = db.Column(db.Integer, db.ForeignKey("item.id"), primary_key=True)
+    related_id = db.Column(db.Integer, db.ForeignKey("item.id"), primary_key=True, index=True)
+    score = db.Column(db.Float, nullable=False)
+
+
+class ItemEvent(db.Model):
+    # Журнал изменений товаров для подписчиков SSE (см. events.py). Без внешнего
+    # ключа: событие об удалении переживает товар. AUTOINCREMENT — чтобы SQLite
+    # не выдал заново id после очистки старых строк
+    id = db.Column(db.Integer, primary_key=True)
+    item_id = db.Column(db.Integer, nullable=False)
+    kind = db.Column(db.String(10), nullable=False)  # created / updated / deleted
+    title = db.Column(db.String(100), nullable=False)
+    price = db.Column(db.Integer, nullable=False)
+    isActive = db.Column(db.Boolean, nullable=False)
+    artist = db.Column(db.String(100), nullable=False)
+    genre = db.Column(db.String(50), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+class DataVersion(db.Model):
+    # Номер версии каждого вида данных для ETag API (см. data_version.py)
+    name = db.Column(db.String(20), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+@db.event.listens_for(DataVersion.__table__, "after_create")
+def data_version_created(table, connection, **kw):
+    seed_versions(connection, table)
+
+
+class ItemViewDaily(db.Model):
+    # Просмотры товара по дням — для рейтинга "популярное за последние N дней"
+    item_id = db.Column(db.Integer, db.ForeignKey("item.id"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True, index=True)
+    views = db.Column(db.Integer, nullable=False, default=0)
+    
+class User(db.Model, UserMixin):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(50), unique = True, nullable = False)
+    password_hash = db.Column(db.String(200), nullable = False)
+    is_admin = db.Column(db.Boolean, default=False)
+    
+    def set_password(self, password):
+       self.password_hash = password_hasher.hash(password)
+        
+    def check_password(self, password):
+        return password_hasher.verify(self.password_hash, password)
+
+
+def item_event_changed(target):
+    # Изменилось ли то, что видит подписчик (название, цена, наличие, исполнитель,
+    # жанр). Описание и картинки подписчикам не интересны
+    attrs = db.inspect(target).attrs
+    for name in ("title", "price", "isActive", "artist", "genre"):
+        history = attrs[name].history
+        if not history.added:
+            continue
+        if not history.deleted:
+            return True  # старое значение не было загружено — сравнить не с чем
+        old, new = history.deleted[0], getattr(target, name)
+        if name == "price":
+            old, new = int(old), int(new)  # "990" из формы и 990 из базы — одна цена
+        if old != new:
+            return True
+    return False
+
+
+@db.event.listens_for(Item, "after_insert")
+def item_created_event(mapper, connection, target):
+    record_event(connection, ItemEvent.__table__, "created", target)
+
+
+@db.event.listens_for(Item, "after_update")
+def item_updated_event(mapper, connection, target):
+    if item_event_changed(target):
+        record_event(connection, ItemEvent.__table__, "updated", target)
+
+
+@db.event.listens_for(Item, "after_delete")
+def item_deleted_event(mapper, connection, target):
+    record_event(connection, ItemEvent.__table__, "deleted", target)
@@ -0,0 +1,195 @@
+# ====== Курсорная (keyset) пагинация ======
+#
+# OFFSET заставляет базу пройти и выбросить все строки предыдущих страниц,
+# а paginate() ещё и делает COUNT(*) на каждый запрос. Здесь вместо номера
+# страницы в URL передаётся курсор — значения ключа сортировки последней
+# (или первой) строки текущей страницы. Следующая страница выбирается
+# условием "строго после этого ключа":
+#
+#     WHERE (price, id) > (:price, :id) ORDER BY price, id LIMIT 41
+#
+# Item.id добавляется в ключ как стабильный разрыв ничьих, поэтому товары
+# с одинаковой ценой или датой не теряются и не повторяются между страницами.
+
+import base64
+import binascii
+import json
+import math
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+
+# Целые в курсоре — в пределах BIGINT: больше база не примет (OverflowError драйвера)
+INT_MIN, INT_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+class InvalidCursor(ValueError):
+    # Курсор не разбирается или не подходит к этой сортировке (см. keyset_paginate(strict=True))
+    pass
+
+
+class SortKey:
+    # Столбец (или выражение) сортировки и направление.
+    # value достаёт значение ключа из объекта строки (по умолчанию — атрибут
+    # с именем столбца), decode превращает значение из курсора обратно в тип столбца
+    # и бросает ValueError/TypeError на всё, что в этот столбец не подставить.
+
+    def __init__(self, column, desc=False, value=None, decode=None):
+        self.column = column
+        self.desc = desc
+        self.value = value or (lambda row: getattr(row, column.key))
+        self.decode = decode or decode_scalar
+
+
+def decode_scalar(value):
+    # Курсор — JSON из URL, его можно подделать: в условие WHERE попадают
+    # только строки и конечные числа (списки, объекты, null, NaN — нет)
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise TypeError("cursor value must be a string or a number")
+    if isinstance(value, int):
+        return decode_int(value)
+    if isinstance(value, float) and not math.isfinite(value):
+        raise ValueError("cursor value must be finite")
+    return value
+
+
+def decode_int(value):
+    # Целочисленные столбцы (id, цена, просмотры): только int в пределах BIGINT
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise TypeError("cursor value must be an integer")
+    if not INT_MIN <= value <= INT_MAX:
+        raise ValueError("cursor value out of range")
+    return value
+
+
+def decode_datetime(value):
+    if not isinstance(value, str):
+        raise TypeError("cursor value must be an ISO 8601 string")
+    return datetime.fromisoformat(value)
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def encode_cursor(data):
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    # Битый или подделанный курсор — просто начинаем с первой страницы
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = json.loads(raw)
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get("k"), list):
+        return None
+    return data
+
+
+class KeysetPagination:
+    # Повторяет нужную шаблону часть интерфейса Pagination из Flask-SQLAlchemy
+    # (items, page, pages, has_next, has_prev), но без точного COUNT(*).
+    # total — приблизительное количество (например, из счётчиков фасетов).
+
+    def __init__(self, items, page, per_page, has_next, has_prev,
+                 next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    @property
+    def pages(self):
+        if not self.total:
+            return 0
+        return max(math.ceil(self.total / self.per_page), self.page)
+
+
+def _seek(keys, values, backwards):
+    # Все ключи сортируются в одном направлении (id — вслед за основным
+    # столбцом), поэтому хватает одного сравнения кортежей
+    columns = tuple_(*[key.column for key in keys])
+    bound = tuple_(*values)
+    forward_desc = keys[0].desc
+    if forward_desc != backwards:
+        return columns < bound
+    return columns > bound
+
+
+def order_clauses(keys, backwards=False):
+    result = []
+    for key in keys:
+        desc = key.desc != backwards
+        result.append(key.column.desc() if desc else key.column.asc())
+    return result
+
+
+def keyset_query(query, keys, values=None, backwards=False, limit=40):
+    # Запрос одной страницы: условие "после ключа" (если он есть), порядок и LIMIT
+    if values is not None:
+        query = query.filter(_seek(keys, values, backwards))
+    return query.order_by(*order_clauses(keys, backwards)).limit(limit)
+
+
+def _cursor_values(data, keys, scope):
+    # Значения ключа и номер страницы из курсора; ValueError/TypeError — курсор не годится
+    if data is None:
+        raise ValueError("malformed cursor")
+    if data.get("s") != scope or len(data["k"]) != len(keys):
+        raise ValueError("cursor belongs to another sort order")
+    values = [key.decode(v) for key, v in zip(keys, data["k"])]
+    page = data.get("n", 2)
+    if isinstance(page, bool) or not isinstance(page, int):
+        raise TypeError("cursor page must be an integer")
+    return values, max(page, 1)
+
+
+def keyset_paginate(query, keys, cursor=None, per_page=40, scope=None, total=None, strict=False):
+    # keys — список SortKey, последним должен идти уникальный столбец (id).
+    # scope — метка сортировки: курсор от другой сортировки игнорируется.
+    # Любой негодный курсор — первая страница; strict=True (API) — InvalidCursor
+    page = 1
+    backwards = False
+    data = values = None
+    if cursor:
+        data = decode_cursor(cursor)
+        try:
+            values, page = _cursor_values(data, keys, scope)
+        except (TypeError, ValueError) as error:
+            if strict:
+                raise InvalidCursor(str(error)) from None
+            data, values, page = None, None, 1
+        else:
+            backwards = data.get("d") == "p"
+
+    rows = keyset_query(query, keys, values, backwards, per_page + 1).all()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+        has_prev, has_next = more, True
+    else:
+        has_prev, has_next = data is not None and page > 1, more
+
+    def make_cursor(row, direction, number):
+        values = [_encode_value(key.value(row)) for key in keys]
+        return encode_cursor({"s": scope, "d": direction, "n": number, "k": values})
+
+    next_cursor = make_cursor(rows[-1], "n", page + 1) if rows and has_next else None
+    prev_cursor = make_cursor(rows[0], "p", page - 1) if rows and has_prev else None
+
+    return KeysetPagination(rows, page, per_page, has_next, has_prev,
+                            next_cursor, prev_cursor, total)
+
@@ -0,0 +1,76 @@
+# ====== Хеширование паролей ======
+#
+# Хеш пароля специально медленный (scrypt/pbkdf2 — сотни миллисекунд CPU),
+# поэтому пачка попыток входа раньше занимала все потоки всех воркеров и
+# каталог переставал отвечать. Теперь:
+#
+#   - метод и параметры задаются настройкой PASSWORD_HASH_METHOD в формате
+#     werkzeug ("scrypt", "scrypt:32768:8:1", "pbkdf2:sha256:600000");
+#   - при успешном входе хеш со старыми параметрами пересчитывается
+#     (needs_rehash) — смена настройки не требует сброса паролей;
+#   - хеширование идёт в отдельном небольшом пуле потоков (hashlib отпускает
+#     GIL), одновременно не больше workers хешей на процесс, а в очереди —
+#     не больше queue_limit. Сверх этого — PasswordHasherBusy (ответ 503),
+#     а не очередь из сотен запросов.
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+
+    def __init__(self, method="scrypt", workers=2, queue_limit=16, timeout=10):
+        self.method = method
+        self._method_id = None
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self._slots = None  # создаются при первом хешировании — настройки можно менять до него
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _submit(self, fn, *args):
+        if self._slots is None:
+            with self._lock:
+                if self._slots is None:
+                    self._slots = threading.BoundedSemaphore(self.workers + self.queue_limit)
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        try:
+            if self._executor is None:
+                with self._lock:
+                    if self._executor is None:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                            thread_name_prefix="passwords")
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise PasswordHasherBusy() from None
+
+    def hash(self, password):
+        return self._submit(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._submit(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        if self._method_id is None:
+            # Полная запись метода с параметрами по умолчанию ("scrypt" -> "scrypt:32768:8:1");
+            # считается один раз, при первом входе
+            self._method_id = self.hash("").split("$", 1)[0]
+        return password_hash.split("$", 1)[0] != self._method_id
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
@@ -0,0 +1,65 @@
+# ====== Блок "Популярное" на главной ======
+#
+# Рейтинг считается не на каждый запрос к /, а заранее: готовый список
+# лежит в памяти процесса, а пересчитывается после записи просмотров
+# (ViewCounter.flush) и по истечении ttl. Пока идёт пересчёт, главная
+# продолжает отдавать предыдущий список.
+#
+# В списке хранятся не ORM-объекты, а простые словари с полями, нужными
+# карточке (id, title, price, cover_image): их безопасно отдавать из
+# разных потоков и не нужно заново подгружать из базы.
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PopularRanking:
+
+    def __init__(self, loader, ttl=60):
+        # loader() возвращает готовый список карточек
+        self._loader = loader
+        self.ttl = ttl
+        self._items = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def get(self):
+        if self._items is None:
+            # Самый первый запрос: считать больше нечего показать
+            self.refresh()
+        elif self.ttl is not None and time.monotonic() - self._loaded_at > self.ttl:
+            self.refresh_async()
+        return self._items or []
+
+    def refresh(self):
+        try:
+            items = list(self._loader())
+        except Exception:
+            logger.exception("Не удалось пересчитать популярные товары")
+            return
+        with self._lock:
+            self._items = items
+            self._loaded_at = time.monotonic()
+
+    def refresh_async(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="popular-refresh", daemon=True).start()
+
+    def invalidate(self):
+        # Товар изменили или удалили — пересчитаем при следующем обращении
+        with self._lock:
+            self._items = None
@@ -0,0 +1,140 @@
+# ====== Статистика цен для фильтра каталога ======
+#
+# Ползунку цены в каталоге нужны минимум, максимум и гистограмма
+# (сколько товаров в каждом ценовом интервале). Считать это запросом
+# по item на каждый показ каталога дорого, поэтому в памяти процесса
+# хранится счётчик {(цена, активен): количество} — по одной записи на
+# каждую различную цену, а не на товар. Он загружается один раз
+# сгруппированным запросом и дальше поправляется по одному товару:
+# apply(old, new) после COMMIT создания, изменения или удаления товара
+# (события модели Item в catalog.py). Массовые изменения (импорт каталога)
+# сбрасывают счётчик целиком, ttl — страховка для других воркеров.
+#
+# Границы цены из URL разбираются здесь же, до любого запроса:
+# нечисловые значения игнорируются, отрицательные и слишком большие
+# обрезаются, перепутанные "от" и "до" меняются местами.
+
+import math
+import threading
+import time
+from collections import Counter
+
+BUCKETS = 20
+# Больше любой разумной цены и меньше предела INTEGER в SQLite
+PRICE_LIMIT = 10 ** 9
+
+
+def parse_price(value):
+    # Строка из URL -> int в [0, PRICE_LIMIT] или None, если цены нет
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value:
+        return None
+    try:
+        price = float(value)  # "1e3", "99.90" и огромные числа (-> inf) тоже разбираются
+    except ValueError:
+        return None
+    if price != price:  # nan
+        return None
+    return int(min(max(price, 0), PRICE_LIMIT))
+
+
+def price_range(min_raw, max_raw):
+    # (min_price, max_price) для фильтра; None — граница не задана
+    min_price, max_price = parse_price(min_raw), parse_price(max_raw)
+    if min_price is not None and max_price is not None and min_price > max_price:
+        min_price, max_price = max_price, min_price
+    if min_price == 0:
+        min_price = None  # цена не бывает отрицательной — фильтр ничего не отсекает
+    return min_price, max_price
+
+
+def _step(low, high, buckets):
+    # "Круглая" ширина интервала (1, 2, 5 x 10^n), чтобы на шкале было
+    # не больше buckets интервалов
+    span = max(high - low + 1, 1)
+    raw = span / float(buckets)
+    magnitude = 10 ** int(math.floor(math.log10(raw))) if raw >= 1 else 1
+    for factor in (1, 2, 5, 10):
+        if factor * magnitude >= raw:
+            return factor * magnitude
+    return 10 * magnitude
+
+
+def histogram(counts, buckets=BUCKETS):
+    # counts — {цена: количество}. Результат для шаблона и API:
+    # {"min", "max", "total", "step", "buckets": [(от, до, количество), ...]}
+    prices = [price for price, count in counts.items() if count > 0]
+    if not prices:
+        return {"min": None, "max": None, "total": 0, "step": None, "buckets": []}
+    low, high = min(prices), max(prices)
+    step = _step(low, high, buckets)
+    start = low - low % step
+    bars = Counter()
+    for price in prices:
+        bars[(price - start) // step] += counts[price]
+    size = (high - start) // step + 1
+    return {
+        "min": low,
+        "max": high,
+        "total": sum(bars.values()),
+        "step": step,
+        "buckets": [(start + i * step, start + (i + 1) * step - 1, bars.get(i, 0)) for i in range(size)],
+    }
+
+
+class PriceStats:
+
+    def __init__(self, loader, ttl=300, buckets=BUCKETS):
+        # loader() возвращает строки (price, isActive, count)
+        self._loader = loader
+        self.ttl = ttl
+        self.buckets = buckets
+        self._counts = None  # {(price, active): count}
+        self._loaded_at = 0.0
+        self._summaries = {}  # active_only -> histogram(...)
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        expired = self.ttl is not None and time.monotonic() - self._loaded_at > self.ttl
+        if self._counts is None or expired:
+            counts = Counter()
+            for price, active, count in self._loader():
+                counts[(price, bool(active))] += count
+            self._counts = counts
+            self._loaded_at = time.monotonic()
+            self._summaries = {}
+
+    def summary(self, active_only=False):
+        # Гистограмма по всему каталогу или только по активным товарам
+        with self._lock:
+            self._ensure_loaded()
+            summary = self._summaries.get(active_only)
+            if summary is None:
+                prices = Counter()
+                for (price, active), count in self._counts.items():
+                    if active or not active_only:
+                        prices[price] += count
+                summary = self._summaries[active_only] = histogram(prices, self.buckets)
+            return summary
+
+    def apply(self, old=None, new=None):
+        # old/new — (price, isActive) товара до и после изменения; None —
+        # товара не было (создание) или больше нет (удаление)
+        with self._lock:
+            if self._counts is None:
+                return  # ещё не загружено — при загрузке всё будет учтено
+            for key, delta in ((old, -1), (new, 1)):
+                if key is None:
+                    continue
+                key = (int(key[0]), bool(key[1]))
+                self._counts[key] += delta
+                if self._counts[key] <= 0:
+                    del self._counts[key]
+            self._summaries = {}
+
+    def invalidate(self):
+        with self._lock:
+            self._counts = None
+            self._summaries = {}
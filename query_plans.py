@@ -0,0 +1,51 @@
+# ====== Проверка планов запросов (EXPLAIN QUERY PLAN) ======
+#
+# Используется командой `flask check-query-plans`: она строит запросы
+# каталога для всех сочетаний фильтров и сортировок ровно так же, как
+# это делает cat(), и проверяет, что SQLite не читает ни одну таблицу
+# целиком ("SCAN item" без "USING INDEX"). Если после изменения запроса
+# или схемы какой-то из них потерял индекс — команда завершится с ошибкой.
+
+import itertools
+import re
+
+# "SCAN item", "SCAN TABLE item" (старые версии SQLite), "SCAN item AS i" —
+# но не "SCAN item USING INDEX ..." и не "SCAN item USING COVERING INDEX ..."
+_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+
+# Варианты фильтров каталога: (активность, мин. цена, макс. цена) и (артисты, жанры, годы)
+BASE_FILTERS = [
+    (False, None, None),
+    (True, None, None),
+    (False, 100, None),
+    (True, 100, 5000),
+]
+FACET_FILTERS = [
+    ((), (), ()),
+    (("x",), (), ()),
+    ((), ("x",), ()),
+    ((), (), (2000,)),
+    (("x", "y"), ("x",), (2000, 2001)),
+]
+
+
+def explain(connection, statement):
+    # План запроса построчно; параметры подставляются прямо в SQL
+    sql = statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True})
+    return [row[-1] for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + str(sql))]
+
+
+def full_scans(plan, tables):
+    # Строки плана, где одна из таблиц tables читается целиком
+    result = []
+    for line in plan:
+        match = _FULL_SCAN.match(line.strip())
+        if match and match.group(1) in tables:
+            result.append(line.strip())
+    return result
+
+
+def catalog_cases(sorts):
+    # Все сочетания: базовые фильтры x фасеты x сортировка x (первая страница / по курсору)
+    for base, facets, sort, seek in itertools.product(BASE_FILTERS, FACET_FILTERS, sorts, (False, True)):
+        yield base, facets, sort, seek
@@ -0,0 +1,58 @@
+# ====== Ограничение частоты попыток ======
+#
+# Фиксированное окно: не больше limit событий на ключ за window секунд.
+# Используется для входа: по IP считаются все попытки, по имени
+# пользователя — только неудачные (успешный вход сбрасывает счётчик).
+# Отказ ничего не стоит — до базы и хеширования пароля дело не доходит.
+#
+# Счётчики живут в памяти процесса, поэтому фактический предел —
+# limit x число воркеров gunicorn. Для общего лимита нужно общее хранилище
+# (Redis и т.п.) с теми же hit/blocked/reset.
+
+import threading
+import time
+
+
+class RateLimiter:
+
+    def __init__(self, limit, window, max_keys=100000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._data = {}  # key -> (начало окна, число событий)
+        self._lock = threading.Lock()
+
+    def _current(self, key, now):
+        entry = self._data.get(key)
+        if entry is None or now - entry[0] >= self.window:
+            return now, 0
+        return entry
+
+    def blocked(self, key):
+        # 0 — можно; иначе через сколько секунд окно закончится
+        now = time.monotonic()
+        with self._lock:
+            started, count = self._current(key, now)
+        if count < self.limit:
+            return 0
+        return max(1, int(started + self.window - now + 1))
+
+    def hit(self, key):
+        # Засчитывает событие; возвращает то же, что blocked() после него
+        now = time.monotonic()
+        with self._lock:
+            started, count = self._current(key, now)
+            if count >= self.limit:
+                return max(1, int(started + self.window - now + 1))
+            self._data[key] = (started, count + 1)
+            if len(self._data) > self.max_keys:
+                self._sweep(now)
+        return 0
+
+    def reset(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def _sweep(self, now):
+        for key in [k for k, (started, _) in self._data.items() if now - started >= self.window]:
+            del self._data[key]
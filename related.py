@@ -0,0 +1,78 @@
+# ====== Похожие товары ("Ещё от этого исполнителя / в этом жанре") ======
+#
+# Список похожих товаров считается заранее и хранится в таблице
+# item_related (item_id, related_id, score), чтобы странице товара не
+# нужно было искать кандидатов на каждый запрос. Кандидаты:
+#
+#   - тот же исполнитель                     — score ARTIST_SCORE;
+#   - тот же жанр и год выпуска ±YEAR_WINDOW — score GENRE_SCORE минус
+#     штраф за каждый год разницы;
+#
+# при равенстве — по числу просмотров. Неактивные товары не предлагаются.
+#
+# Пересчёт инкрементальный: после изменения товара X пересчитываются X,
+# товары, у которых X уже в списке, и товары того же исполнителя (там X
+# должен появиться). Соседи по жанру подтянут X при своём следующем
+# пересчёте или после `flask related-index` (полная перестройка).
+
+ARTIST_SCORE = 10.0
+GENRE_SCORE = 5.0
+YEAR_PENALTY = 0.5
+YEAR_WINDOW = 5
+
+RELATED_COUNT = 4
+# Сколько кандидатов каждого вида брать из базы (самые просматриваемые)
+CANDIDATES = 20
+
+
+def candidates(session, item_model, item, limit=RELATED_COUNT):
+    # [(related_id, score)] для одного товара: два запроса по индексам
+    # (artist, ...) и genre / release_year. item_model — Item или витрина ItemListing
+    columns = (item_model.id, item_model.release_year)
+    scores = {}
+    same_artist = (session.query(*columns)
+                   .filter(item_model.artist == item.artist, item_model.id != item.id,
+                           item_model.isActive == True)
+                   .order_by(item_model.views.desc(), item_model.id.desc())
+                   .limit(CANDIDATES))
+    for related_id, _ in same_artist:
+        scores[related_id] = ARTIST_SCORE
+    same_genre = (session.query(*columns)
+                  .filter(item_model.genre == item.genre, item_model.id != item.id,
+                          item_model.isActive == True,
+                          item_model.release_year.between(item.release_year - YEAR_WINDOW,
+                                                          item.release_year + YEAR_WINDOW))
+                  .order_by(item_model.views.desc(), item_model.id.desc())
+                  .limit(CANDIDATES))
+    for rank, (related_id, year) in enumerate(same_genre):
+        score = GENRE_SCORE - YEAR_PENALTY * abs(year - item.release_year)
+        # Порядок выборки (по просмотрам) — тай-брейк внутри одинакового score
+        scores[related_id] = max(scores.get(related_id, 0), score - rank * 0.001)
+    best = sorted(scores.items(), key=lambda pair: -pair[1])[:limit]
+    return best
+
+
+def rebuild(session, item_model, related_model, item_ids):
+    # Пересчитывает списки для item_ids (удалённые товары просто очищаются)
+    item_ids = list(item_ids)
+    if not item_ids:
+        return
+    session.query(related_model).filter(related_model.item_id.in_(item_ids)).delete(synchronize_session=False)
+    rows = []
+    for item in session.query(item_model).filter(item_model.id.in_(item_ids)):
+        for related_id, score in candidates(session, item_model, item):
+            rows.append({"item_id": item.id, "related_id": related_id, "score": score})
+    if rows:
+        session.execute(related_model.__table__.insert(), rows)
+
+
+def affected(session, item_model, related_model, item_id, artists=()):
+    # Чьи списки могли измениться из-за товара item_id: он сам, товары со
+    # ссылкой на него и товары исполнителей artists (старое и новое имя)
+    ids = {item_id}
+    ids.update(row.item_id for row in
+               session.query(related_model.item_id).filter(related_model.related_id == item_id))
+    artists = [artist for artist in set(artists) if artist]
+    if artists:
+        ids.update(row.id for row in session.query(item_model.id).filter(item_model.artist.in_(artists)))
+    return ids
@@ -0,0 +1,185 @@
+# ====== Кеш готовых страниц ======
+#
+# Публичные страницы (/, /about, /posts, /posts/<id>, /cat, /cat/<id>, ...)
+# для анонимных посетителей одинаковы, поэтому готовый HTML кладётся в кеш
+# по ключу: путь + отсортированные параметры URL + состояние авторизации.
+# Админ всегда получает свежую страницу (кеш для него отключён).
+#
+# Инвалидация через "поколения" тегов: у каждой страницы есть теги
+# ("items", "item:5", "articles"), их текущие номера входят в ключ.
+# Роут, изменивший товар, увеличивает номер тега — и все страницы с этим
+# тегом получают новые ключи, а старые записи просто вытесняются из LRU.
+# Так не нужно помнить, какие именно ключи зависят от тега, и это же
+# работает с общим хранилищем (Redis и т.п.): достаточно реализовать
+# get/set/incr/counter как у MemoryBackend.
+#
+# Каждый ответ получает ETag (хеш тела) и Last-Modified, поэтому браузер
+# при повторном заходе получает 304 без тела.
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import request
+from flask_login import current_user
+
+
+class MemoryBackend:
+    # LRU в памяти процесса с ограничением по числу записей, по суммарному
+    # размеру тел и по времени жизни записи
+
+    def __init__(self, max_entries=1000, max_bytes=50 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()  # key -> (expires_at, size, value)
+        self._counters = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                return None
+            self._data.move_to_end(key)
+            return entry[2]
+
+    def set(self, key, value, ttl, size=0):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (time.monotonic() + ttl, size, value)
+            self._size += size
+            while self._data and (len(self._data) > self.max_entries or self._size > self.max_bytes):
+                self._remove(next(iter(self._data)))
+
+    def _remove(self, key):
+        _, size, _ = self._data.pop(key)
+        self._size -= size
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def incr(self, name):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + 1
+
+    def counter(self, name):
+        return self._counters.get(name, 0)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+
+
+class CachedPage:
+
+    def __init__(self, body, status, mimetype, etag, last_modified):
+        self.body = body
+        self.status = status
+        self.mimetype = mimetype
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class ResponseCache:
+
+    def __init__(self, app=None, backend=None):
+        self.backend = backend
+        self.app = app
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("RESPONSE_CACHE_ENABLED", True)
+        app.config.setdefault("RESPONSE_CACHE_TTL", 60)
+        app.config.setdefault("RESPONSE_CACHE_MAX_ENTRIES", 1000)
+        app.config.setdefault("RESPONSE_CACHE_MAX_BYTES", 50 * 1024 * 1024)
+        if self.backend is None:
+            self.backend = MemoryBackend(app.config["RESPONSE_CACHE_MAX_ENTRIES"],
+                                         app.config["RESPONSE_CACHE_MAX_BYTES"])
+        self.app = app
+
+    def invalidate(self, *tags):
+        for tag in tags:
+            self.backend.incr("tag:" + tag)
+
+    def clear(self):
+        self.backend.clear()
+
+    def version(self, *tags):
+        # Текущие номера тегов одной строкой — меняется при каждой инвалидации
+        return ",".join("%s=%d" % (tag, self.backend.counter("tag:" + tag)) for tag in tags)
+
+    def _auth_state(self):
+        # None — страницу нельзя кешировать (админ);
+        # "anon" — общая для всех гостей; "user:<id>" — в шапке имя пользователя
+        if not current_user.is_authenticated:
+            return "anon"
+        if current_user.is_admin:
+            return None
+        return "user:%s" % current_user.get_id()
+
+    def _key(self, tags, auth):
+        # Пустые параметры отбрасываем, порядок не важен: ?b=1&a=2 == ?a=2&b=1&c=
+        args = sorted((k, v) for k, v in request.args.items(multi=True) if v != "")
+        return "page:%s?%s|%s|%s" % (request.path, args, auth, self.version(*tags))
+
+    def cached(self, *tags, on_hit=None):
+        # Теги могут ссылаться на аргументы роута: "item:{id}".
+        # on_hit вызывается с аргументами роута, когда страница отдана из кеша
+        # (например, чтобы всё равно засчитать просмотр товара).
+
+        def decorator(view):
+            @wraps(view)
+            def wrapper(**kwargs):
+                if not self.app.config["RESPONSE_CACHE_ENABLED"] or request.method not in ("GET", "HEAD"):
+                    return view(**kwargs)
+                auth = self._auth_state()
+                if auth is None:
+                    return view(**kwargs)
+
+                key = self._key([tag.format(**kwargs) for tag in tags], auth)
+                page = self.backend.get(key)
+                if page is not None:
+                    if on_hit is not None:
+                        on_hit(**kwargs)
+                    return self._respond(page, auth)
+
+                response = self.app.make_response(view(**kwargs))
+                if response.status_code != 200 or response.direct_passthrough or "Set-Cookie" in response.headers:
+                    return response
+                body = response.get_data()
+                page = CachedPage(body, response.status_code, response.mimetype,
+                                  hashlib.sha1(body).hexdigest(),
+                                  datetime.now(timezone.utc).replace(microsecond=0))
+                self.backend.set(key, page, self.app.config["RESPONSE_CACHE_TTL"], size=len(body))
+                return self._respond(page, auth)
+
+            return wrapper
+
+        return decorator
+
+    def _respond(self, page, auth):
+        response = self.app.response_class(page.body, status=page.status, mimetype=page.mimetype)
+        response.set_etag(page.etag)
+        response.last_modified = page.last_modified
+        # Браузер хранит копию, но каждый раз сверяет её по ETag (дешёвый 304)
+        response.cache_control.no_cache = True
+        if auth == "anon":
+            response.cache_control.public = True
+        else:
+            response.cache_control.private = True
+        response.vary.add("Cookie")
+        return response.make_conditional(request)
@@ -0,0 +1,178 @@
+# ====== Полнотекстовый поиск (SQLite FTS5) ======
+#
+# item_fts и article_fts — виртуальные таблицы FTS5 с внешним содержимым
+# (content='item' / content='article'): сам текст хранится только в основных
+# таблицах, в FTS лежит лишь инвертированный индекс. Синхронизацию делают
+# триггеры на INSERT/UPDATE/DELETE, поэтому индекс не отстаёт ни от роутов
+# CRUD, ни от массового импорта, ни от ручных правок в базе.
+#
+# Схема создаётся миграцией; create_search_index() нужна для баз, созданных
+# через db.create_all(), и для команды `flask search-index`.
+#
+# В PostgreSQL вместо FTS5 — встроенный полнотекстовый поиск: GIN-индекс
+# по выражению to_tsvector() с весами полей (A-D), ранжирование ts_rank,
+# фрагменты ts_headline. Отдельных таблиц и триггеров там не нужно.
+
+import re
+
+from markupsafe import Markup, escape
+from sqlalchemy import text
+
+# Поля и веса для bm25(): совпадение в названии важнее, чем в описании
+ITEM_FIELDS = ("title", "artist", "genre", "text")
+ITEM_WEIGHTS = (10.0, 5.0, 3.0, 1.0)
+ARTICLE_FIELDS = ("title", "intro", "text")
+ARTICLE_WEIGHTS = (10.0, 4.0, 1.0)
+
+# Служебные символы вокруг совпадений в snippet(): сначала экранируем
+# текст, потом меняем их на <mark>, чтобы HTML из описаний не попал в страницу
+_MARK_START = "\x02"
+_MARK_END = "\x03"
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def _schema(table, content, fields):
+    columns = ", ".join(fields)
+    new_values = ", ".join("new.%s" % f for f in fields)
+    old_values = ", ".join("old.%s" % f for f in fields)
+    return [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS {t} USING fts5({c}, content='{src}', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')".format(t=table, c=columns, src=content),
+        "CREATE TRIGGER IF NOT EXISTS {t}_ai AFTER INSERT ON {src} BEGIN "
+        "INSERT INTO {t}(rowid, {c}) VALUES (new.id, {new}); END".format(
+            t=table, src=content, c=columns, new=new_values),
+        "CREATE TRIGGER IF NOT EXISTS {t}_ad AFTER DELETE ON {src} BEGIN "
+        "INSERT INTO {t}({t}, rowid, {c}) VALUES ('delete', old.id, {old}); END".format(
+            t=table, src=content, c=columns, old=old_values),
+        # Только при изменении индексируемых полей: запись просмотров сюда не попадает
+        "CREATE TRIGGER IF NOT EXISTS {t}_au AFTER UPDATE OF {c} ON {src} BEGIN "
+        "INSERT INTO {t}({t}, rowid, {c}) VALUES ('delete', old.id, {old}); "
+        "INSERT INTO {t}(rowid, {c}) VALUES (new.id, {new}); END".format(
+            t=table, src=content, c=columns, old=old_values, new=new_values),
+    ]
+
+
+# Имена виртуальных таблиц (и их служебных item_fts_data, item_fts_idx, ...)
+FTS_TABLES = ("item_fts", "article_fts")
+
+SCHEMA = _schema("item_fts", "item", ITEM_FIELDS) + _schema("article_fts", "article", ARTICLE_FIELDS)
+
+
+# Веса полей для setweight(): A — самое важное (как ITEM_WEIGHTS/ARTICLE_WEIGHTS)
+_PG_LABELS = "ABCD"
+
+
+def _pg_document(table, fields):
+    # Выражение должно совпадать с индексом буква в букву, иначе индекс не используется
+    return " || ".join("setweight(to_tsvector('simple', coalesce(%s.%s, '')), '%s')" % (table, f, label)
+                       for f, label in zip(fields, _PG_LABELS))
+
+
+PG_ITEM_DOCUMENT = _pg_document("item", ITEM_FIELDS)
+PG_ARTICLE_DOCUMENT = _pg_document("article", ARTICLE_FIELDS)
+PG_INDEXES = ("ix_item_search", "ix_article_search")
+PG_SCHEMA = [
+    "CREATE INDEX IF NOT EXISTS ix_item_search ON item USING gin ((%s))" % PG_ITEM_DOCUMENT,
+    "CREATE INDEX IF NOT EXISTS ix_article_search ON article USING gin ((%s))" % PG_ARTICLE_DOCUMENT,
+]
+
+
+def create_search_index(connection, rebuild=True):
+    if connection.dialect.name == "postgresql":
+        for statement in PG_SCHEMA:
+            connection.exec_driver_sql(statement)
+        if rebuild:
+            connection.exec_driver_sql("REINDEX INDEX ix_item_search")
+            connection.exec_driver_sql("REINDEX INDEX ix_article_search")
+        return
+    for statement in SCHEMA:
+        connection.exec_driver_sql(statement)
+    if rebuild:
+        # Заново строим индекс по текущему содержимому таблиц
+        connection.exec_driver_sql("INSERT INTO item_fts(item_fts) VALUES ('rebuild')")
+        connection.exec_driver_sql("INSERT INTO article_fts(article_fts) VALUES ('rebuild')")
+
+
+def is_search_table(name):
+    # Для autogenerate в Alembic: этих таблиц (и GIN-индексов PostgreSQL)
+    # нет в моделях, но удалять их не нужно
+    return name.startswith(FTS_TABLES) or name in PG_INDEXES
+
+
+def match_query(q):
+    # Пользовательский ввод -> запрос FTS5: каждое слово в кавычках (чтобы
+    # AND/OR/NEAR и прочий синтаксис FTS5 не ломали запрос) и с * для поиска
+    # по префиксу. "black sab" -> "black"* "sab"*
+    words = _WORD.findall(q or "")
+    return " ".join('"%s"*' % w for w in words)
+
+
+def pg_match_query(q):
+    # То же для to_tsquery: "black sab" -> "black:* & sab:*"
+    words = _WORD.findall(q or "")
+    return " & ".join("%s:*" % w for w in words)
+
+
+def highlight(snippet):
+    return Markup(str(escape(snippet)).replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>"))
+
+
+def _search(session, sql, match, limit, **params):
+    rows = session.execute(text(sql), dict(params, match=match, limit=limit,
+                                           start=_MARK_START, end=_MARK_END)).mappings().all()
+    return [dict(row, snippet=highlight(row["snippet"])) for row in rows]
+
+
+def _pg_search(session, table, columns, document, fields, weights, words, q, limit):
+    # ts_rank принимает веса в порядке {D, C, B, A}
+    match = pg_match_query(q)
+    if not match:
+        return []
+    padded = list(weights) + [0.0] * (len(_PG_LABELS) - len(weights))
+    rank_weights = "{%s}" % ",".join("%g" % (w / weights[0]) for w in reversed(padded))
+    headline = "concat_ws(' ', %s)" % ", ".join("%s.%s" % (table, f) for f in fields)
+    sql = (
+        "SELECT {columns}, ts_headline('simple', {headline}, query, :options) AS snippet "
+        "FROM {table}, to_tsquery('simple', :match) AS query "
+        "WHERE ({document}) @@ query "
+        "ORDER BY ts_rank(CAST(:weights AS float4[]), {document}, query) DESC, {table}.id DESC "
+        "LIMIT :limit"
+    ).format(columns=columns, headline=headline, table=table, document=document)
+    options = "StartSel=%s, StopSel=%s, MaxWords=%d, MinWords=%d, MaxFragments=1, FragmentDelimiter=…" % (
+        _MARK_START, _MARK_END, words, words // 2)
+    return _search(session, sql, match, limit, options=options, weights=rank_weights)
+
+
+def search_items(session, q, limit=20):
+    if session.get_bind().dialect.name == "postgresql":
+        return _pg_search(session, "item", "item.id, item.title, item.price, item.cover_image",
+                          PG_ITEM_DOCUMENT, ITEM_FIELDS, ITEM_WEIGHTS, 16, q, limit)
+    match = match_query(q)
+    if not match:
+        return []
+    sql = (
+        "SELECT item.id, item.title, item.price, item.cover_image, "
+        "snippet(item_fts, -1, :start, :end, '…', 16) AS snippet "
+        "FROM item_fts JOIN item ON item.id = item_fts.rowid "
+        "WHERE item_fts MATCH :match "
+        "ORDER BY bm25(item_fts, %s) LIMIT :limit" % ", ".join(map(str, ITEM_WEIGHTS))
+    )
+    return _search(session, sql, match, limit)
+
+
+def search_articles(session, q, limit=20):
+    if session.get_bind().dialect.name == "postgresql":
+        return _pg_search(session, "article", "article.id, article.title",
+                          PG_ARTICLE_DOCUMENT, ARTICLE_FIELDS, ARTICLE_WEIGHTS, 24, q, limit)
+    match = match_query(q)
+    if not match:
+        return []
+    sql = (
+        "SELECT article.id, article.title, "
+        "snippet(article_fts, -1, :start, :end, '…', 24) AS snippet "
+        "FROM article_fts JOIN article ON article.id = article_fts.rowid "
+        "WHERE article_fts MATCH :match "
+        "ORDER BY bm25(article_fts, %s) LIMIT :limit" % ", ".join(map(str, ARTICLE_WEIGHTS))
+    )
+    return _search(session, sql, match, limit)
@@ -0,0 +1,78 @@
+# Общие фикстуры: приложение на отдельной базе SQLite во временной папке
+# (схема — db.create_all() и индекс поиска, как в bench.py) и наполнение товарами.
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    # Приложение с переопределёнными настройками (то, что create_app читает при создании)
+    import auth
+    import catalog
+    from app import create_app
+    from extensions import db
+    from search import create_search_index
+
+    apps = []
+
+    def make(**overrides):
+        config = {
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///" + str(tmp_path / "test.db"),
+            "TEMPLATE_CACHE_DIR": str(tmp_path / "jinja-cache"),
+            "TEMPLATE_WARMUP": False,
+            "RESPONSE_CACHE_ENABLED": False,
+            "IMAGE_RECONCILE_INTERVAL": 0,
+        }
+        config.update(overrides)
+        app = create_app(config)
+        with app.app_context():
+            # Только основная база: bind реплики (test_replica.py) остаётся в db.metadatas и после теста
+            db.create_all(bind_key=None)
+            with db.engine.begin() as connection:
+                create_search_index(connection, rebuild=False)
+            # Кеши и лимиты в памяти — на уровне модулей и переживают приложение из прошлого теста
+            catalog.items_changed()
+        auth.user_cache.invalidate()
+        auth.login_ip_limiter.reset("127.0.0.1")
+        apps.append(app)
+        return app
+
+    yield make
+    catalog.view_counter.stop()
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def add_items(app):
+    import catalog
+    from extensions import db
+    from models import Item
+
+    def add(count, artist="Artist", genre="doom"):
+        with app.app_context():
+            start = db.session.query(db.func.count(Item.id)).scalar()
+            for i in range(start, start + count):
+                db.session.add(Item(title="Album %d" % i, price=500 + i, text="text", artist="%s %d" % (artist, i % 7),
+                                    genre=genre, release_year=1990 + i % 30))
+            db.session.commit()
+            catalog.items_changed()
+    return add
@@ -0,0 +1,52 @@
+# Ошибки параметров JSON API — 400 с JSON, а не страница 500 и не молчаливая подмена
+
+import base64
+import json
+
+import pytest
+
+
+def cursor(data):
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("raw", [
+    "%%%",
+    cursor([1, 2]),
+    cursor({"s": "api:new", "n": 2, "k": [{"a": 1}, 1]}),
+    cursor({"s": "api:new", "n": 2, "k": ["2020-01-01T00:00:00", 2 ** 70]}),
+    cursor({"s": "api:price_asc", "n": 2, "k": [500, 1]}),  # курсор другой сортировки
+])
+def test_items_invalid_cursor(client, add_items, raw):
+    add_items(3)
+    response = client.get("/api/v1/items", query_string={"cursor": raw})
+    assert response.status_code == 400
+    assert response.json["error"].startswith("invalid cursor")
+
+
+def test_articles_invalid_cursor(client):
+    response = client.get("/api/v1/articles", query_string={"cursor": cursor({"s": "api:articles", "k": [[1], 1]})})
+    assert response.status_code == 400
+    assert response.json["error"].startswith("invalid cursor")
+
+
+def test_valid_cursor_follows(client, add_items):
+    add_items(5)
+    first = client.get("/api/v1/items?limit=2").json
+    second = client.get("/api/v1/items", query_string={"limit": 2, "cursor": first["next"]})
+    assert second.status_code == 200
+    assert [item["id"] for item in second.json["data"]] == [3, 2]
+
+
+@pytest.mark.parametrize("url", ["/api/v1/items", "/api/v1/articles"])
+@pytest.mark.parametrize("limit", ["0", "-5", "abc"])
+def test_bad_limit(client, url, limit):
+    response = client.get(url, query_string={"limit": limit})
+    assert response.status_code == 400
+    assert "limit" in response.json["error"]
+
+
+def test_limit_capped_at_maximum(app, client, add_items):
+    add_items(5)
+    app.config["API_MAX_PAGE_SIZE"] = 3
+    assert len(client.get("/api/v1/items?limit=1000").json["data"]) == 3
@@ -0,0 +1,57 @@
+# ETag JSON API из общих номеров версий (data_version): один и тот же в любом
+# воркере и меняется только вместе с данными
+
+import os
+import subprocess
+import sys
+
+import catalog
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Другой воркер — отдельный процесс на той же базе: печатает статус ответа на If-None-Match
+WORKER = """
+import sys
+from app import create_app
+app = create_app({"SQLALCHEMY_DATABASE_URI": sys.argv[1], "TEMPLATE_CACHE_DIR": sys.argv[2],
+                  "TEMPLATE_WARMUP": False, "IMAGE_RECONCILE_INTERVAL": 0})
+client = app.test_client()
+for url, etag in zip(sys.argv[3::2], sys.argv[4::2]):
+    print(client.get(url, headers={"If-None-Match": etag}).status_code)
+"""
+
+
+def revalidate(client, url, etag):
+    return client.get(url, headers={"If-None-Match": etag}).status_code
+
+
+def test_etag_shared_between_workers(app, client, add_items, tmp_path):
+    add_items(3)
+    args = []
+    for url in ("/api/v1/items", "/api/v1/items/1", "/api/v1/articles"):
+        response = client.get(url)
+        assert response.status_code == 200
+        args += [url, response.headers["ETag"]]
+    worker = subprocess.run([sys.executable, "-c", WORKER, app.config["SQLALCHEMY_DATABASE_URI"],
+                             str(tmp_path / "worker-jinja-cache")] + args,
+                            cwd=ROOT, capture_output=True, text=True)
+    assert worker.returncode == 0, worker.stderr[-2000:]
+    assert worker.stdout.split() == ["304", "304", "304"]
+
+
+def test_etag_changes_with_data(app, client, add_items):
+    add_items(3)
+    etag = client.get("/api/v1/items").headers["ETag"]
+    assert revalidate(client, "/api/v1/items", etag) == 304
+    with app.app_context():
+        catalog.items_changed(1)
+    assert revalidate(client, "/api/v1/items", etag) == 200
+
+
+def test_views_change_only_popular_etag(client, add_items):
+    add_items(3)
+    urls = ["/api/v1/items", "/api/v1/items?sort=popular", "/api/v1/items?fields=id,views"]
+    etags = [client.get(url).headers["ETag"] for url in urls]
+    catalog.view_counter.hit(1)
+    catalog.view_counter.flush()
+    assert [revalidate(client, url, etag) for url, etag in zip(urls, etags)] == [304, 200, 200]
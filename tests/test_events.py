@@ -0,0 +1,24 @@
+# SSE только в сервисе событий (EVENTS_ENABLED), подписка со страницы — только при EVENTS_URL
+
+def test_events_disabled_by_default(client, add_items):
+    add_items(1)
+    assert client.get("/cat/1/events").status_code == 404
+    assert client.get("/events/items").status_code == 404
+    assert b"EventSource" not in client.get("/cat/1").data
+
+
+def test_item_page_subscribes_to_events_service(app, client, add_items):
+    add_items(1)
+    app.config["EVENTS_URL"] = "http://events.example"
+    assert b"new EventSource('http://events.example/cat/1/events')" in client.get("/cat/1").data
+
+
+def test_events_service(app, client, add_items):
+    add_items(1)
+    app.config["EVENTS_ENABLED"] = True
+    response = client.get("/cat/1/events", buffered=False)
+    try:
+        assert response.status_code == 200
+        assert response.mimetype == "text/event-stream"
+    finally:
+        response.close()
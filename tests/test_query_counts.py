@@ -0,0 +1,74 @@
+# Число SQL-запросов на горячих страницах не зависит от числа товаров,
+# картинок и похожих товаров (нет N+1): считаем before_cursor_execute
+
+import threading
+
+import pytest
+from sqlalchemy import event
+
+import catalog
+from extensions import db
+from models import Item, ItemImage, ItemListing, ItemRelated
+from related import rebuild as rebuild_related
+
+def seed(app, items, images):
+    with app.app_context():
+        for i in range(items):
+            item = Item(title="Album %d" % i, price=500 + i, text="text", artist="Artist %d" % (i % 5),
+                        genre="doom", release_year=1990 + i % 30, views=i)
+            item.images = [ItemImage(filename="%02x/%064x.jpg" % (n, i * 10 + n)) for n in range(images)]
+            db.session.add(item)
+        db.session.commit()
+        rebuild_related(db.session, ItemListing, ItemRelated, [row.id for row in db.session.query(Item.id)])
+        db.session.commit()
+
+
+def count_queries(app, client, url):
+    # Только запросы этого потока: счётчик просмотров пишет в базу из своего
+    thread = threading.get_ident()
+    statements = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == thread:
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert response.status_code == 200, url
+    return len(statements)
+
+
+# Запросов на страницу с пустыми кешами — при любом числе товаров, картинок и похожих
+BUDGET = {
+    "/": 2,  # популярное (по дням + добор по всем просмотрам)
+    "/cat": 3,  # фасеты, страница, статистика цен
+    "/cat?sort=price_asc&active=1": 4,  # + фасеты с фильтром активности
+    "/cat?sort=popular&artist=Artist 1&artist=Artist 2": 3,  # цены под выбранные фасеты — одним запросом
+    "/cat?page=2": 3,  # старые ссылки через OFFSET
+    "/cat/1": 2,  # товар с картинками одним JOIN, похожие товары
+}
+
+
+@pytest.mark.parametrize("items, images", [(3, 1), (45, 2), (130, 4)])
+def test_query_count_does_not_grow_with_rows(app, client, items, images):
+    # 3 товара — меньше одной страницы каталога (40), 45 — чуть больше, 130 — несколько страниц
+    seed(app, items, images)
+    counts = {}
+    for url in BUDGET:
+        with app.app_context():
+            catalog.items_changed()  # пустые кеши — худший случай
+        counts[url] = count_queries(app, client, url)
+    assert counts == BUDGET
+
+
+def test_warm_item_page_makes_no_queries(app, client):
+    seed(app, 10, 3)
+    with app.app_context():
+        catalog.items_changed()
+    count_queries(app, client, "/cat/1")
+    assert count_queries(app, client, "/cat/1") == 0
@@ -0,0 +1,10 @@
+# `flask check-query-plans` на схеме из моделей: ни один запрос каталога и
+# статей не читает таблицу целиком (иначе команда печатает FULL SCAN и выходит с 1)
+
+
+def test_check_query_plans_finds_no_full_scans(app, add_items):
+    add_items(50)
+    result = app.test_cli_runner().invoke(args=["check-query-plans"])
+    assert "FULL SCAN" not in result.output
+    assert ", 0 с полным сканированием" in result.output
+    assert result.exit_code == 0
@@ -0,0 +1,36 @@
+# Лимит попыток входа по IP: за прокси — по адресу клиента из X-Forwarded-For
+
+import auth
+
+
+def attempts(client, ip, count):
+    statuses = []
+    for _ in range(count):
+        response = client.post("/login", data={"username": "nobody", "password": "x"},
+                               headers={"X-Forwarded-For": ip}, environ_base={"REMOTE_ADDR": "10.0.0.1"})
+        statuses.append(response.status_code)
+    return statuses
+
+
+def test_clients_behind_proxy_have_separate_limits(make_app):
+    app = make_app(TRUSTED_PROXIES=1, LOGIN_RATE_LIMIT_IP=(3, 60), LOGIN_RATE_LIMIT_USER=(100, 300))
+    client = app.test_client()
+    try:
+        assert attempts(client, "203.0.113.1", 4)[-1] == 429
+        assert attempts(client, "203.0.113.2", 1) == [200]  # другой клиент за тем же nginx
+    finally:
+        for ip in ("203.0.113.1", "203.0.113.2"):
+            auth.login_ip_limiter.reset(ip)
+        auth.login_user_limiter.reset("nobody")
+
+
+def test_forwarded_header_ignored_without_proxy(make_app):
+    app = make_app(LOGIN_RATE_LIMIT_IP=(3, 60), LOGIN_RATE_LIMIT_USER=(100, 300))
+    client = app.test_client()
+    try:
+        assert attempts(client, "203.0.113.1", 3) == [200, 200, 200]
+        # Подделанный X-Forwarded-For не даёт нового лимита: считается адрес соединения
+        assert attempts(client, "203.0.113.9", 1) == [429]
+    finally:
+        auth.login_ip_limiter.reset("10.0.0.1")
+        auth.login_user_limiter.reset("nobody")
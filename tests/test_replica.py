@@ -0,0 +1,40 @@
+# Реплика, которая отстаёт: отдельная база SQLite со схемой, но без товаров.
+# После изменения товаров кеши сброшены, и заполнять их заново с реплики нельзя.
+
+import pytest
+
+import catalog
+import database
+from extensions import db
+from models import Item
+
+
+@pytest.fixture
+def replica_app(make_app, tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "_primary_until", 0.0)
+
+    def make(**overrides):
+        app = make_app(SQLALCHEMY_BINDS={database.REPLICA: "sqlite:///" + str(tmp_path / "replica.db")}, **overrides)
+        with app.app_context():
+            db.metadata.create_all(db.engines[database.REPLICA])
+            for i in range(3):
+                db.session.add(Item(title="Album %d" % i, price=500 + i, text="text", artist="Artist", genre="doom",
+                                    release_year=1990))
+            db.session.commit()
+            catalog.items_changed()
+        return app
+    return make
+
+
+def test_reads_after_write_go_to_primary(replica_app):
+    client = replica_app().test_client()
+    assert len(client.get("/api/v1/items").get_json()["data"]) == 3
+    assert client.get("/api/v1/items/1").status_code == 200
+    assert b"Artist" in client.get("/cat").data  # фасеты посчитаны по основной базе
+
+
+def test_reads_go_to_replica_once_it_caught_up(replica_app):
+    client = replica_app(REPLICA_MAX_LAG=0).test_client()
+    assert client.get("/api/v1/items").get_json()["data"] == []
+    assert client.get("/api/v1/items/1").status_code == 404
+    assert b"Artist" not in client.get("/cat").data
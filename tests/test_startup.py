@@ -0,0 +1,13 @@
+# То же, что проверяет bench_startup.py (код выхода 1): при старте воркера не
+# импортируются модули, нужные только командам и загрузке картинок (FORBIDDEN)
+
+import pytest
+
+import bench_startup
+
+
+@pytest.mark.parametrize("name,code", bench_startup.CASES, ids=[name for name, _ in bench_startup.CASES])
+def test_no_forbidden_imports_at_startup(name, code, tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "sqlite:///" + str(tmp_path / "startup.db"))
+    _, _, _, modules = bench_startup.run_once(code)
+    assert bench_startup.forbidden(modules) == []
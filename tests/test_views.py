@@ -0,0 +1,88 @@
+# Буфер просмотров и удалённые товары: внешние ключи включены (как всегда в PostgreSQL)
+
+import pytest
+
+import catalog
+from extensions import db
+from models import Item, ItemViewDaily, User
+from view_counter import ViewCounter
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(SQLITE_PRAGMAS={"foreign_keys": "ON"}, VIEW_FLUSH_INTERVAL=60)
+
+
+def views(app):
+    with app.app_context():
+        return ({item.id: item.views or 0 for item in Item.query},
+                {row.item_id: row.views for row in ItemViewDaily.query})
+
+
+def test_flush_skips_items_deleted_after_the_hit(app, add_items):
+    add_items(2)
+    catalog.view_counter.hit(1)
+    catalog.view_counter.hit(2, 2)
+    with app.app_context():
+        db.session.execute(db.delete(Item).where(Item.id == 2))
+        db.session.commit()
+    catalog.view_counter.flush()
+    assert catalog.view_counter.pending() == 0
+    assert views(app) == ({1: 1}, {1: 1})
+
+
+def test_item_delete_drops_buffered_views(app, add_items):
+    add_items(2)
+    with app.app_context():
+        db.session.add(User(username="admin", password_hash="-", is_admin=True))
+        db.session.commit()
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = "1"
+    catalog.view_counter.hit(1)
+    catalog.view_counter.hit(2, 2)
+    assert client.get("/cat/2/delete").status_code == 302
+    assert catalog.view_counter.pending() == 1
+    catalog.view_counter.flush()
+    assert views(app) == ({1: 1}, {1: 1})
+
+
+def failing_flush(written, bad):
+    def flush(increments):
+        if bad & set(increments):
+            raise RuntimeError("bad item")
+        for item_id, count in increments.items():
+            written[item_id] = written.get(item_id, 0) + count
+    return flush
+
+
+def test_bad_item_does_not_block_the_batch():
+    written, bad = {}, {2}
+    counter = ViewCounter(failing_flush(written, bad), interval=60, max_retries=2)
+    counter.hit(1)
+    counter.hit(2)
+    counter.hit(3, 3)
+    counter.flush()
+    assert written == {1: 1, 3: 3}
+    assert counter.pending() == 1
+    counter.hit(1)
+    counter.flush()
+    counter.flush()
+    assert written == {1: 2, 3: 3}
+    assert counter.pending() == 0  # третья неудача подряд — просмотры товара 2 отброшены
+    counter.stop()
+
+
+def test_retries_reset_after_success():
+    written, bad = {}, {2}
+    counter = ViewCounter(failing_flush(written, bad), interval=60, max_retries=1)
+    counter.hit(2)
+    counter.flush()
+    bad.clear()
+    counter.flush()
+    assert written == {2: 1}
+    bad.add(2)
+    counter.hit(2)
+    counter.flush()
+    assert counter.pending(2) == 1  # счёт неудач начался заново
+    counter.stop()
@@ -0,0 +1,73 @@
+# ====== Кеш пользователей для Flask-Login ======
+#
+# user_loader вызывается на каждый запрос вошедшего пользователя, а шапке
+# любой страницы нужны только id, username и is_admin. Вместо SELECT * FROM
+# user на каждый запрос храним в памяти процесса небольшой снимок этих полей
+# (LRU с ограничением по числу записей и по времени жизни).
+#
+# Снимок — обычный объект, не ORM: его безопасно отдавать из разных потоков,
+# и он не тянет за собой password_hash. Изменение или удаление пользователя
+# в этом процессе сразу сбрасывает его запись (события модели User в auth.py),
+# остальные воркеры увидят изменения не позже чем через ttl секунд.
+
+import threading
+import time
+from collections import OrderedDict
+
+from flask_login import UserMixin
+
+
+class UserSnapshot(UserMixin):
+
+    def __init__(self, id, username, is_admin):
+        self.id = id
+        self.username = username
+        self.is_admin = bool(is_admin)
+
+    def __repr__(self):
+        return "<UserSnapshot %r>" % self.id
+
+
+class UserCache:
+
+    def __init__(self, loader, ttl=60, max_entries=10000):
+        # loader(id) возвращает UserSnapshot или None, если пользователя нет
+        self._loader = loader
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # id -> (expires_at, snapshot или None)
+        self._lock = threading.Lock()
+        self._generation = 0  # растёт при каждом invalidate()
+
+    def get(self, user_id):
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._data.move_to_end(user_id)
+                return entry[1]
+            generation = self._generation
+
+        # Загрузка вне блокировки; удалённый пользователь (None) тоже кешируется,
+        # чтобы старая cookie не стоила запроса к базе каждый раз
+        snapshot = self._loader(user_id)
+        with self._lock:
+            if generation != self._generation:
+                return snapshot  # пока грузили, пользователя изменили — не сохраняем
+            self._data[user_id] = (now + self.ttl, snapshot)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            self._generation += 1
+            if user_id is None:
+                self._data.clear()
+            else:
+                self._data.pop(user_id, None)
@@ -0,0 +1,142 @@
+# ====== Буферизованный счётчик просмотров ======
+#
+# Раньше каждый показ /cat/<id> делал UPDATE item SET views = ... и COMMIT,
+# т.е. самая посещаемая страница брала блокировку записи SQLite на всю базу.
+# Теперь просмотры копятся в памяти ({item_id: сколько добавить}) и раз в
+# interval секунд (или когда набралось threshold просмотров) сбрасываются
+# в базу одним UPDATE ... CASE. При остановке процесса остаток тоже сбрасывается.
+#
+# interval — окно "долговечности": при аварийном падении процесса теряется
+# не больше просмотров, чем накопилось за это время. interval = 0 отключает
+# буфер — каждый просмотр пишется сразу, как раньше.
+#
+# Если пачка не записалась, она пишется заново по одному товару: одна плохая
+# запись не держит остальные. Не записавшееся возвращается в буфер, но не
+# больше max_retries сбросов подряд — дальше просмотры товара отбрасываются,
+# иначе буфер и лог ошибок росли бы без предела.
+
+import atexit
+import logging
+import os
+import threading
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+
+    def __init__(self, flush, interval=5.0, threshold=500, max_retries=5):
+        # flush(increments) — функция, которая пишет словарь {item_id: +N} в базу
+        self._flush = flush
+        self.interval = interval
+        self.threshold = threshold
+        self.max_retries = max_retries
+        self._pending = Counter()
+        self._failures = Counter()  # item_id -> неудачных попыток подряд
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+        self._pid = None
+        # Функции, которые вызываются после успешной записи в базу
+        # (например, пересчёт блока "Популярное")
+        self.listeners = []
+        atexit.register(self.stop)
+
+    def hit(self, item_id, count=1):
+        if not self.interval:
+            self._write(Counter({item_id: count}))
+            return
+        with self._lock:
+            self._pending[item_id] += count
+            full = sum(self._pending.values()) >= self.threshold
+        self._ensure_thread()
+        if full:
+            self._wakeup.set()
+
+    def pending(self, item_id=None):
+        # Ещё не записанные просмотры (всего или по одному товару)
+        with self._lock:
+            if item_id is None:
+                return sum(self._pending.values())
+            return self._pending.get(item_id, 0)
+
+    def discard(self, item_id):
+        # Товар удалён — ещё не записанные просмотры больше не нужны
+        with self._lock:
+            self._pending.pop(item_id, None)
+            self._failures.pop(item_id, None)
+
+    def flush(self):
+        # Забираем накопленное под блокировкой, пишем в базу уже без неё,
+        # чтобы новые просмотры не ждали окончания UPDATE
+        with self._flush_lock:
+            with self._lock:
+                increments, self._pending = self._pending, Counter()
+            if increments:
+                self._write(increments)
+
+    def _write(self, increments):
+        try:
+            self._flush(dict(increments))
+            written, failed = increments, Counter()
+        except Exception:
+            logger.exception("Не удалось записать просмотры")
+            written, failed = self._write_each(increments) if len(increments) > 1 else (Counter(), increments)
+        with self._lock:
+            for item_id in written:
+                self._failures.pop(item_id, None)
+            for item_id, count in failed.items():
+                self._failures[item_id] += 1
+                if self._failures[item_id] > self.max_retries:
+                    del self._failures[item_id]
+                    logger.error("Просмотры товара %s не записаны за %d попыток и отброшены: %d",
+                                 item_id, self.max_retries + 1, count)
+                else:
+                    self._pending[item_id] += count  # до следующей попытки
+        if not written:
+            return
+        for listener in self.listeners:
+            try:
+                listener(written)
+            except Exception:
+                logger.exception("Ошибка в обработчике записи просмотров")
+
+    def _write_each(self, increments):
+        # Пачка не записалась — по одному товару, чтобы найти тот, что мешает
+        written, failed = Counter(), Counter()
+        for item_id, count in increments.items():
+            try:
+                self._flush({item_id: count})
+                written[item_id] = count
+            except Exception as error:
+                logger.warning("Не удалось записать просмотры товара %s: %s", item_id, error)
+                failed[item_id] = count
+        return written, failed
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=self.interval + 5)
+        self.flush()
+
+    def _ensure_thread(self):
+        # Поток запускается лениво и заново после fork(): в воркерах
+        # gunicorn потоки мастер-процесса не существуют
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="view-counter", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
@@ -0,0 +1,8 @@
+# ====== Точка входа для WSGI-сервера ======
+# gunicorn -c gunicorn.conf.py wsgi:app
+# (app.py можно запускать напрямую только для разработки)
+
+from app import create_app
+
+app = create_app()
+application = app